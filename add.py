@@ -1,7 +1,11 @@
-import os
 import cv2
 import numpy as np
 import random
+from parallel import process_directory
+from lut import build_lut, apply_lut
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
 
 def apply_add_effect(frame, value=50):
     """
@@ -19,6 +23,19 @@ def apply_add_effect(frame, value=50):
 
     return frame_with_add
 
+def add_effect_lut(value=50):
+    """
+    Build the lookup table equivalent of apply_add_effect, so a whole clip can be processed with one cv2.LUT per frame.
+    
+    Parameters:
+        value (int): The value to add to each pixel. Default is 50.
+    
+    Returns:
+        numpy.ndarray: The (256, 1, 3) uint8 lookup table.
+    """
+    # cv2.add reads np.array([value]) as the scalar (value, 0, 0, 0), so only the first (blue) channel changes
+    return build_lut([("add", (value, 0, 0))])
+
 def apply_add_effect_to_video(video_path, output_path, value=50, num_frames=None):
     """
     Apply an "Add" effect to each frame of the input video and save the result to a new video.
@@ -30,7 +47,7 @@ def apply_add_effect_to_video(video_path, output_path, value=50, num_frames=None
         num_frames (int): The number of frames to process. If None, process all frames. Default is None.
     """
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Check if the video file was successfully opened
     if not cap.isOpened():
@@ -48,34 +65,35 @@ def apply_add_effect_to_video(video_path, output_path, value=50, num_frames=None
         num_frames = num_frames_total
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    out = open_video_writer(output_path, fps, (width, height))
 
     # Check if the output video file was successfully created
     if not out.isOpened():
         print(f"Error: Could not create output video file '{output_path}'")
         return
 
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
-            break
+    # Build the lookup table once for the whole clip
+    lut = add_effect_lut(value)
 
-        # Apply "Add" effect to the frame
-        frame_with_add = apply_add_effect(frame, value=value)
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
+                break
 
-        # Write the transformed frame to the output video
-        out.write(frame_with_add)
+            # Apply "Add" effect to the frame
+            frame_with_add = telemetry.timed("transformed", apply_lut, frame, lut)
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, frame_with_add)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
-
-def process_videos_in_directory(input_dir, output_dir, value=50):
+def process_videos_in_directory(input_dir, output_dir, value=50, *, workers=1, seed=None):
     """
     Apply an "Add" effect to all videos in the input directory and save the results to the output directory.
     
@@ -83,19 +101,11 @@ def process_videos_in_directory(input_dir, output_dir, value=50):
         input_dir (str): The path to the input directory containing video files.
         output_dir (str): The path to the output directory to save processed videos.
         value (int): The value to add to each pixel. Default is 50.
+        workers (int): The number of worker processes. Default is 1 (one file at a time).
+        seed (int): The base random seed; seeded runs give the same output for any worker count. Default is None.
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply "Add" effect to the video
-            apply_add_effect_to_video(input_video_path, output_video_path, value=value)
-            print(f"Add effect applied to {filename}.")
+    process_directory(input_dir, output_dir, apply_add_effect_to_video, label="Add effect",
+                      workers=workers, seed=seed, value=value)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\shooting"
@@ -1,11 +1,106 @@
-import os
 import cv2
 import numpy as np
-from skimage.transform import PiecewiseAffineTransform, warp
+import random
+from collections import OrderedDict
+from skimage.transform import PiecewiseAffineTransform
+from parallel import process_directory
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
 
-def apply_piecewise_affine(video_path, output_path, num_frames=None):
+# Remap tables keyed by (width, height, src_points, dst_points), most recently used last
+_remap_cache = OrderedDict()
+REMAP_CACHE_SIZE = 16
+
+def default_control_points(width, height):
+    # Define control points for the transformation
+    src_points = np.array([[0, 0], [0, height - 1], [width - 1, 0], [width - 1, height - 1]])
+    dst_points = np.array([[0, 0], [0, height - 1], [width - 1, 100], [width - 1, height - 101]])
+    return src_points, dst_points
+
+def random_mesh_points(width, height, grid_size=4, jitter=0.05, variant=0):
+    """
+    Build a randomised mesh for the Piecewise Affine Transform.
+
+    The mesh is fully determined by `variant`, so drawing the variant from a small range
+    lets randomised clips share remap tables through the cache.
+
+    Parameters:
+        width (int): The frame width.
+        height (int): The frame height.
+        grid_size (int): The number of control points along each axis. Default is 4.
+        jitter (float): The maximum displacement of inner points as a fraction of the cell size. Default is 0.05.
+        variant (int): Selects the random mesh. Default is 0.
+
+    Returns:
+        tuple: The source and destination control points.
+    """
+    xs = np.linspace(0, width - 1, grid_size)
+    ys = np.linspace(0, height - 1, grid_size)
+    src_points = np.array([[x, y] for y in ys for x in xs])
+
+    # Only move inner points so the frame border stays in place
+    rng = np.random.default_rng(variant)
+    cell = np.array([(width - 1) / (grid_size - 1), (height - 1) / (grid_size - 1)])
+    offsets = rng.uniform(-jitter, jitter, src_points.shape) * cell
+    inner = ((src_points[:, 0] > 0) & (src_points[:, 0] < width - 1) &
+             (src_points[:, 1] > 0) & (src_points[:, 1] < height - 1))
+    dst_points = src_points.copy()
+    dst_points[inner] += offsets[inner]
+
+    return src_points, dst_points
+
+def get_piecewise_affine_maps(width, height, src_points, dst_points):
+    """
+    Get the float32 map_x/map_y tables for a Piecewise Affine Transform, computing them once per
+    (resolution, control points) and caching the result.
+
+    Parameters:
+        width (int): The frame width.
+        height (int): The frame height.
+        src_points (numpy.ndarray): The source control points.
+        dst_points (numpy.ndarray): The destination control points.
+
+    Returns:
+        tuple: The map_x and map_y tables for cv2.remap.
+    """
+    src_points = np.asarray(src_points, dtype=np.float64)
+    dst_points = np.asarray(dst_points, dtype=np.float64)
+    key = (width, height, src_points.tobytes(), dst_points.tobytes())
+
+    maps = _remap_cache.get(key)
+    if maps is not None:
+        _remap_cache.move_to_end(key)
+        return maps
+
+    transformer = PiecewiseAffineTransform()
+    transformer.estimate(src_points, dst_points)
+
+    # warp() uses the transform as the inverse map: output pixel -> input coordinate.
+    # Pixels outside the mesh map to -1 and are filled with black by the constant border.
+    ys, xs = np.mgrid[0:height, 0:width]
+    coords = transformer(np.column_stack([xs.ravel(), ys.ravel()]))
+    map_x = coords[:, 0].reshape(height, width).astype(np.float32)
+    map_y = coords[:, 1].reshape(height, width).astype(np.float32)
+
+    _remap_cache[key] = (map_x, map_y)
+    if len(_remap_cache) > REMAP_CACHE_SIZE:
+        _remap_cache.popitem(last=False)
+
+    return map_x, map_y
+
+def apply_piecewise_affine_effect(frame, src_points=None, dst_points=None):
+    height, width = frame.shape[:2]
+    if src_points is None or dst_points is None:
+        src_points, dst_points = default_control_points(width, height)
+
+    # Apply Piecewise Affine Transform with the cached remap tables, staying in uint8
+    map_x, map_y = get_piecewise_affine_maps(width, height, src_points, dst_points)
+    return cv2.remap(frame, map_x, map_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+def apply_piecewise_affine(video_path, output_path, num_frames=None, random_mesh=False, num_variants=8):
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Get video properties
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -18,49 +113,35 @@ def apply_piecewise_affine(video_path, output_path, num_frames=None):
         num_frames = num_frames_total
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
-
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Define control points for the transformation
-        src_points = np.array([[0, 0], [0, height - 1], [width - 1, 0], [width - 1, height - 1]])
-        dst_points = np.array([[0, 0], [0, height - 1], [width - 1, 100], [width - 1, height - 101]])
+    out = open_video_writer(output_path, fps, (width, height))
 
-        # Apply Piecewise Affine Transform
-        transformer = PiecewiseAffineTransform()
-        transformer.estimate(src_points, dst_points)
-        warped_frame = warp(frame, transformer)
+    # Pick the control points once per video; random meshes come from a small pool of cached variants
+    if random_mesh:
+        src_points, dst_points = random_mesh_points(width, height, variant=random.randrange(num_variants))
+    else:
+        src_points, dst_points = default_control_points(width, height)
 
-        # Convert frame to uint8 for writing
-        warped_frame = (warped_frame * 255).astype(np.uint8)
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                break
 
-        # Write the transformed frame to the output video
-        out.write(warped_frame)
+            # Apply Piecewise Affine Transform
+            warped_frame = telemetry.timed("transformed", apply_piecewise_affine_effect, frame, src_points, dst_points)
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, warped_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
-
-def process_videos_in_directory(input_dir, output_dir):
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".mp4"):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply Piecewise Affine Transform to the video
-            apply_piecewise_affine(input_video_path, output_video_path)
-            print(f"Piecewise Affine Transform applied to {filename}.")
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None):
+    # Apply Piecewise Affine Transform to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_piecewise_affine, label="Piecewise Affine Transform",
+                      extensions=(".mp4",), workers=workers, seed=seed)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\theft"
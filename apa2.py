@@ -1,10 +1,13 @@
-import os
 import cv2
 import numpy as np
-from skimage.transform import PiecewiseAffineTransform, warp
+from apa import default_control_points, get_piecewise_affine_maps
+from parallel import process_directory
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
 
 def apply_piecewise_affine(video_path, output_path, num_frames=None):
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = cap.get(cv2.CAP_PROP_FPS)
@@ -12,39 +15,33 @@ def apply_piecewise_affine(video_path, output_path, num_frames=None):
     if num_frames is None:
         num_frames = num_frames_total
 
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    out = open_video_writer(output_path, fps, (width, height))
 
-    src_points = np.array([[0, 0], [0, height - 1], [width - 1, 0], [width - 1, height - 1]])
-    dst_points = np.array([[0, 0], [0, height - 1], [width - 1, 100], [width - 1, height - 101]])
+    src_points, dst_points = default_control_points(width, height)
+    map_x, map_y = get_piecewise_affine_maps(width, height, src_points, dst_points)
 
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
+    try:
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                break
 
-        transformer = PiecewiseAffineTransform()
-        transformer.estimate(src_points, dst_points)
-        warped_frame = warp(frame, transformer)
-        warped_frame = (warped_frame * 255).astype(np.uint8)
+            warped_frame = telemetry.timed("transformed", cv2.remap, frame, map_x, map_y, cv2.INTER_LINEAR,
+                                           borderMode=cv2.BORDER_CONSTANT, borderValue=0)
 
-        out.write(warped_frame)
-
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
-
-    cap.release()
-    out.release()
+            telemetry.timed("encoded", out.write, warped_frame)
+    finally:
+        cap.release()
+        out.release()
 
 def process_video(video_path, output_path):
     apply_piecewise_affine(video_path, output_path)
     print(f"Piecewise Affine Transform applied to {video_path}.")
 
-def process_videos_in_directory(input_dir, output_dir):
-    os.makedirs(output_dir, exist_ok=True)
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4", ".avi", ".mov")):
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            process_video(input_video_path, output_video_path)
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None):
+    # Apply Piecewise Affine Transform to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_piecewise_affine, label="Piecewise Affine Transform",
+                      extensions=(".mp4", ".avi", ".mov"), workers=workers, seed=seed)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\re"
@@ -0,0 +1,134 @@
+import time
+import cv2
+import numpy as np
+from parallel import process_directory
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
+from sampling import open_selected_video
+
+def iter_video_chunks(cap, chunk_size, num_frames, frame_shape, num_slots=2):
+    """
+    Read a video in chunks of up to `chunk_size` frames into a preallocated uint8 ring buffer.
+
+    Frames are decoded straight into the buffer (cap.read writes into the given slot), so no
+    per-frame arrays are allocated. The yielded chunk is a view into the ring and is overwritten
+    `num_slots` chunks later.
+
+    Parameters:
+        cap (cv2.VideoCapture): The opened video.
+        chunk_size (int): The number of frames per chunk (T).
+        num_frames (int): The maximum number of frames to read.
+        frame_shape (tuple): The (height, width, channels) of one frame.
+        num_slots (int): The number of chunks the ring holds. Default is 2.
+
+    Yields:
+        numpy.ndarray: A (T, H, W, C) uint8 chunk; the last chunk may be shorter.
+    """
+    ring = np.empty((num_slots, chunk_size) + tuple(frame_shape), dtype=np.uint8)
+    frames_read = 0
+    slot = 0
+    while frames_read < num_frames:
+        chunk = ring[slot]
+        count = 0
+        while count < chunk_size and frames_read < num_frames:
+            ret, _ = cap.read(chunk[count])
+            if not ret:
+                num_frames = frames_read
+                break
+            count += 1
+            frames_read += 1
+        if count:
+            yield chunk[:count]
+        slot = (slot + 1) % num_slots
+
+def apply_batch_function_to_video(video_path, output_path, batch_function, chunk_size=32, num_frames=None, selection=None):
+    """
+    Apply a batched function (frames -> frames) to a video one chunk of frames at a time and save the result.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+        output_path (str): The path to save the output video file.
+        batch_function (callable): Takes a (T, H, W, C) uint8 array and returns the transformed frames. It may
+            modify the chunk in place.
+        chunk_size (int): The number of frames per chunk. Default is 32.
+        num_frames (int): The number of frames to process. If None, process all frames. Default is None.
+        selection (dict): Frame selection (stride, start_time, end_time, num_clips, clip_len), see
+            sampling.select_frames. Unselected frames are skipped without being converted. Default is None.
+    """
+    # Open video file, reading only the selected frames if a selection is given
+    cap = open_selected_video(video_path, **selection) if selection else open_video(video_path)
+
+    # Check if the video file was successfully opened
+    if not cap.isOpened():
+        print(f"Error: Could not open video file '{video_path}'")
+        return
+
+    # Get video properties
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # Determine the number of frames to process
+    if num_frames is None:
+        num_frames = num_frames_total
+
+    # Create output video
+    out = open_video_writer(output_path, fps, (width, height))
+
+    # Check if the output video file was successfully created
+    if not out.isOpened():
+        print(f"Error: Could not create output video file '{output_path}'")
+        return
+
+    try:
+        # Iterate over chunks of frames
+        chunks = iter_video_chunks(cap, chunk_size, num_frames, (height, width, 3))
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            telemetry.add("decoded", len(chunk), time.perf_counter() - start)
+
+            # Transform the whole chunk at once
+            start = time.perf_counter()
+            transformed_frames = batch_function(chunk)
+            telemetry.add("transformed", len(chunk), time.perf_counter() - start)
+
+            # Write the frames in order
+            for frame in transformed_frames:
+                telemetry.timed("encoded", out.write, frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
+
+def process_videos_in_directory(input_dir, output_dir, batch_function, *, chunk_size=32, workers=1, seed=None, selection=None):
+    """
+    Apply a batched function to all videos in the input directory.
+
+    Parameters:
+        input_dir (str): The path to the input directory containing video files.
+        output_dir (str): The path to the output directory to save processed videos.
+        batch_function (callable): Takes a (T, H, W, C) uint8 array and returns the transformed frames.
+        chunk_size (int): The number of frames per chunk. Default is 32.
+        workers (int): The number of worker processes. Default is 1 (one file at a time).
+        seed (int): The base random seed; seeded runs give the same output for any worker count. Default is None.
+        selection (dict): Frame selection applied to every video, see sampling.select_frames. Default is None.
+    """
+    process_directory(input_dir, output_dir, apply_batch_function_to_video,
+                      label=getattr(batch_function, "__name__", "Transform"), workers=workers, seed=seed,
+                      batch_function=batch_function, chunk_size=chunk_size, selection=selection)
+
+if __name__ == "__main__":
+    from mul import apply_random_multiply_batch
+
+    input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\assault"
+    output_dir = "C:\\Users\\Wilbert\\Desktop\\data\\augmented\\assaultmultiply"
+
+    # Process all videos in the input directory
+    process_videos_in_directory(input_dir, output_dir, apply_random_multiply_batch)
+
+    print("All videos processed successfully.")
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import multiprocessing
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESOLUTIONS = {
+    "240p": (320, 240),
+    "480p": (640, 480),
+    "1080p": (1920, 1080),
+}
+
+def get_transforms():
+    """
+    Return the per-frame functions to benchmark, keyed by name.
+
+    Imported lazily so worker processes only pay for the modules they need.
+    """
+    from add import apply_add_effect
+    from mul import apply_random_multiply
+    from salt import apply_salt_effect
+    from ranrot import apply_random_rotation
+    from shear import apply_static_shear_effect
+    from gaussianblur import apply_gaussian_blur_effect
+    from superpix import apply_superpixel_effect
+    from apa import apply_piecewise_affine_effect
+
+    return {
+        "add": apply_add_effect,
+        "multiply": apply_random_multiply,
+        "salt": apply_salt_effect,
+        "rotation": apply_random_rotation,
+        "shear": partial(apply_static_shear_effect, shear_factor=0.2),
+        "gaussian_blur": apply_gaussian_blur_effect,
+        "superpixel": apply_superpixel_effect,
+        "piecewise_affine": apply_piecewise_affine_effect,
+    }
+
+def generate_synthetic_video(path, width, height, num_frames, fps=30, seed=0):
+    """
+    Write a deterministic synthetic video: a gradient background with moving blocks and a little noise,
+    so codecs and content-dependent transforms (SLIC) see something video-like.
+
+    Parameters:
+        path (str): The path to save the video file.
+        width (int): The frame width.
+        height (int): The frame height.
+        num_frames (int): The number of frames.
+        fps (float): The frame rate. Default is 30.
+        seed (int): The random seed for the block layout and noise. Default is 0.
+    """
+    rng = np.random.default_rng(seed)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+
+    ys, xs = np.mgrid[0:height, 0:width]
+    background = np.dstack([xs * 255 // max(width - 1, 1), ys * 255 // max(height - 1, 1),
+                            (xs + ys) * 255 // max(width + height - 2, 1)]).astype(np.uint8)
+    blocks = [(rng.integers(0, width), rng.integers(0, height), rng.integers(-8, 9), rng.integers(-8, 9),
+               tuple(int(c) for c in rng.integers(0, 256, 3))) for _ in range(8)]
+    size = max(min(width, height) // 8, 4)
+
+    for i in range(num_frames):
+        frame = background.copy()
+        for x, y, dx, dy, color in blocks:
+            cx, cy = int(x + dx * i) % width, int(y + dy * i) % height
+            cv2.rectangle(frame, (cx, cy), (cx + size, cy + size), color, -1)
+        noise = rng.integers(-8, 9, frame.shape, dtype=np.int16)
+        out.write(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+
+    out.release()
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, or None if it cannot be measured."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+def benchmark_transform(name, video_path, resolution, warmup=2, seed=0):
+    """
+    Time one transform over every frame of a video.
+
+    Frames are decoded one at a time and only the transform call is timed, so memory holds a single
+    frame rather than the clip. Runs in its own process, so the peak RSS belongs to this transform alone;
+    transform_rss_mb is how much the peak grew once the transform started running.
+
+    Returns:
+        dict: The transform, resolution, clip length, frame count, fps, p50/p99 per-frame latency in ms,
+            peak RSS in MB and the growth of peak RSS caused by the transform in MB.
+    """
+    import random
+    random.seed(seed)
+    np.random.seed(seed)
+    transform = get_transforms()[name]
+
+    cap = cv2.VideoCapture(video_path)
+    clip_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # Baseline: interpreter, modules and an open decoder with one frame, before the transform runs
+    ret, frame = cap.read()
+    baseline_rss = peak_rss_mb()
+
+    # Warm up caches (remap tables, LUTs) the way a long clip would
+    for _ in range(warmup):
+        if ret:
+            transform(frame.copy())
+
+    latencies = []
+    while ret:
+        # Copy outside the timed region, since some transforms modify the frame in place
+        frame = frame.copy()
+        start = time.perf_counter()
+        transform(frame)
+        latencies.append(time.perf_counter() - start)
+        ret, frame = cap.read()
+    cap.release()
+
+    latencies = np.array(latencies)
+    peak_rss = peak_rss_mb()
+    return {
+        "transform": name,
+        "resolution": resolution,
+        "clip_frames": clip_frames,
+        "frames": len(latencies),
+        "fps": len(latencies) / latencies.sum() if latencies.sum() else None,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "peak_rss_mb": peak_rss,
+        "transform_rss_mb": None if peak_rss is None else peak_rss - baseline_rss,
+    }
+
+def run_benchmarks(transforms, resolutions, lengths, video_dir, seed=0):
+    """
+    Generate (or reuse) the synthetic videos and benchmark every transform at every resolution and clip length.
+
+    Returns:
+        dict: Run metadata and a list of result rows.
+    """
+    os.makedirs(video_dir, exist_ok=True)
+    results = []
+
+    # One fresh process per case keeps peak RSS measurements separate
+    context = multiprocessing.get_context("spawn")
+    for resolution in resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for num_frames in lengths:
+            video_path = os.path.join(video_dir, f"synthetic_{resolution}_{num_frames}f_seed{seed}.mp4")
+            if not os.path.exists(video_path):
+                generate_synthetic_video(video_path, width, height, num_frames, seed=seed)
+
+            for name in transforms:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(benchmark_transform, name, video_path, resolution, seed=seed).result()
+                results.append(result)
+                print(f"{name:>16} {resolution:>6} {num_frames:>5}f: {result['fps']:9.1f} fps, "
+                      f"p50 {result['p50_ms']:8.2f} ms, p99 {result['p99_ms']:8.2f} ms, "
+                      f"transform RSS {float('nan') if result['transform_rss_mb'] is None else result['transform_rss_mb']:8.1f} MB")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+            "lengths": list(lengths),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    Compare two benchmark runs and return the cases whose fps dropped by more than `threshold`.
+
+    Returns:
+        list: (transform, resolution, clip length, baseline fps, current fps) for each regression.
+    """
+    # Results from before clip lengths were recorded compare by frame count
+    def case(row):
+        return row["transform"], row["resolution"], row.get("clip_frames", row["frames"])
+
+    baseline_fps = {case(row): row["fps"] for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old_fps = baseline_fps.get(case(row))
+        if old_fps and row["fps"] is not None and row["fps"] < old_fps * (1 - threshold):
+            regressions.append((*case(row), old_fps, row["fps"]))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the augmentation transforms on synthetic videos.")
+    parser.add_argument("--transforms", nargs="+", default=None, help="Transforms to run (default: all).")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--frames", nargs="+", type=int, default=[60], help="Clip lengths (frames per synthetic video).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--video-dir", default=os.path.join(tempfile.gettempdir(), "video_aug_bench"))
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to save the JSON results.")
+    parser.add_argument("--compare", default=None, help="A previous results JSON to check for regressions.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed fps drop before flagging a regression.")
+    args = parser.parse_args()
+
+    transforms = args.transforms or list(get_transforms())
+    report = run_benchmarks(transforms, args.resolutions, args.frames, args.video_dir, seed=args.seed)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, report, args.threshold)
+        for name, resolution, length, old_fps, new_fps in regressions:
+            print(f"Regression: {name} {resolution} {length}f {old_fps:.1f} -> {new_fps:.1f} fps")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
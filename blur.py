@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+# Above this sigma the fast mode blurs at a reduced pyramid level instead of with box filters
+PYRAMID_SIGMA = 6.0
+
+# Box-filter passes used to approximate a Gaussian in the fast mode (3 is within a few percent)
+BOX_PASSES = 3
+
+def ksize_to_sigma(ksize):
+    """
+    Return the sigma cv2.GaussianBlur uses for a kernel size when it is given sigma=0.
+
+    Parameters:
+        ksize (int): The (odd) kernel size.
+
+    Returns:
+        float: The equivalent sigma.
+    """
+    return 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+def box_sizes(sigma, passes=BOX_PASSES):
+    """
+    Choose odd box widths whose repeated application has the variance of a Gaussian with the given sigma.
+
+    Parameters:
+        sigma (float): The target standard deviation in pixels.
+        passes (int): The number of box-filter passes. Default is BOX_PASSES.
+
+    Returns:
+        list: The box width for each pass.
+    """
+    # A box of width w has variance (w^2 - 1) / 12; mix the two odd widths around the ideal one so the
+    # total variance comes closest to sigma^2
+    ideal = np.sqrt(12 * sigma * sigma / passes + 1)
+    lower = max(int(np.floor(ideal)), 1)
+    if lower % 2 == 0:
+        lower -= 1
+    upper = lower + 2
+    target = sigma * sigma
+    num_lower = min(range(passes + 1),
+                    key=lambda n: abs(n * (lower * lower - 1) / 12 + (passes - n) * (upper * upper - 1) / 12 - target))
+    return [lower] * num_lower + [upper] * (passes - num_lower)
+
+def _box_blur(frame, sigma):
+    # Each cv2.blur pass costs the same whatever the box width
+    for size in box_sizes(sigma):
+        if size > 1:
+            frame = cv2.blur(frame, (size, size), borderType=cv2.BORDER_REFLECT_101)
+    return frame
+
+def _pyramid_blur(frame, sigma):
+    # Each pyrDown applies a [1 4 6 4 1] / 16 kernel (variance 1 at its level) before halving; descend while the
+    # blur is still wide at the next level, blur the remaining variance there and scale back up
+    height, width = frame.shape[:2]
+    levels = 0
+    while sigma / 2 ** (levels + 1) >= 2.0 and min(height, width) >> (levels + 1) >= 8:
+        levels += 1
+
+    small = frame
+    for _ in range(levels):
+        small = cv2.pyrDown(small)
+    pyramid_variance = (4 ** levels - 1) / 3
+    residual = np.sqrt(max(sigma * sigma - pyramid_variance, 0.0)) / 2 ** levels
+    if residual > 0.5:
+        small = cv2.GaussianBlur(small, (0, 0), residual)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+def gaussian_blur(frame, sigma, mode="exact"):
+    """
+    Blur a frame with a Gaussian of the given sigma.
+
+    Parameters:
+        frame (numpy.ndarray): The input frame.
+        sigma (float): The standard deviation of the blur in pixels.
+        mode (str): "exact" for cv2.GaussianBlur, or "fast" for repeated box filters (constant cost per pixel)
+            and, above PYRAMID_SIGMA, a blur at a reduced pyramid level scaled back up. Default is "exact".
+
+    Returns:
+        numpy.ndarray: The blurred frame.
+    """
+    if sigma <= 0:
+        return frame
+    if mode == "exact":
+        return cv2.GaussianBlur(frame, (0, 0), sigma)
+    if mode != "fast":
+        raise ValueError(f"Unknown blur mode '{mode}'")
+    if sigma >= PYRAMID_SIGMA:
+        return _pyramid_blur(frame, sigma)
+    return _box_blur(frame, sigma)
+
+def gaussian_blur_levels(frame, sigmas, mode="exact"):
+    """
+    Blur a frame at several strengths, each level built from the previous one.
+
+    Gaussians compose by adding variances, so going from sigma a to sigma b only needs a blur of
+    sqrt(b^2 - a^2), which is narrower (and cheaper) than blurring the original to b from scratch.
+
+    Parameters:
+        frame (numpy.ndarray): The input frame.
+        sigmas (list): The blur strengths, in any order.
+        mode (str): "exact" or "fast", as for gaussian_blur. Default is "exact".
+
+    Returns:
+        list: The blurred frames, in the order of `sigmas`.
+    """
+    levels = {}
+    current, current_sigma = frame, 0.0
+    for sigma in sorted(set(sigmas)):
+        step = np.sqrt(max(sigma * sigma - current_sigma * current_sigma, 0.0))
+        # The fast mode's pyramid path assumes an unblurred input, so levels it handles start from the original frame
+        if mode == "fast" and sigma >= PYRAMID_SIGMA:
+            current = gaussian_blur(frame, sigma, mode)
+        else:
+            current = gaussian_blur(current, step, mode)
+        current_sigma = sigma
+        levels[sigma] = current
+    return [levels[sigma] for sigma in sigmas]
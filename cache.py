@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+from functools import partial
+
+import numpy as np
+
+# Manifest of finished outputs, stored in each output directory
+MANIFEST_NAME = ".augment_manifest.json"
+
+# Marker in the name of outputs that are still being written
+PARTIAL_MARKER = ".partial"
+
+def input_fingerprint(path, hash_contents=False):
+    """
+    Identify the contents of an input file.
+
+    Parameters:
+        path (str): The path to the file.
+        hash_contents (bool): If True, hash the file contents (slow, but survives copies that reset mtime).
+            If False, use size and modification time. Default is False.
+
+    Returns:
+        dict: The fingerprint.
+    """
+    stat = os.stat(path)
+    if not hash_contents:
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "sha256": digest.hexdigest()}
+
+def _describe(value):
+    # Turn parameters that JSON cannot encode into a stable description
+    if isinstance(value, partial):
+        return {"function": _describe(value.func), "args": list(value.args), "keywords": value.keywords}
+    if callable(value):
+        if hasattr(value, "__qualname__"):
+            return value.__qualname__
+        # A callable object (e.g. down.RandomDownsample): its class and settings, not its repr with an address
+        return {"class": type(value).__qualname__, "attributes": getattr(value, "__dict__", {})}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+def cache_key(input_path, transform_name, params, seed, hash_contents=False):
+    """
+    Build the key for one output: input fingerprint, transform name, parameters and seed.
+
+    Returns:
+        str: A hex digest that changes whenever any of them change.
+    """
+    description = {
+        "input": input_fingerprint(input_path, hash_contents),
+        "transform": transform_name,
+        "params": params,
+        "seed": seed,
+    }
+    encoded = json.dumps(description, sort_keys=True, default=_describe)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def load_manifest(output_dir):
+    """Load the manifest of an output directory, or an empty one if there is none yet."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(output_dir, manifest):
+    """Write the manifest atomically, so an interrupted run never leaves it half-written."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    temp_path = path + PARTIAL_MARKER
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+def is_up_to_date(manifest, filename, key, output_path):
+    """
+    Check whether an output was already produced for this key and is still on disk unchanged.
+    """
+    entry = manifest.get(filename)
+    if entry is None or entry.get("key") != key:
+        return False
+    # The output may have been renamed since (see rename_outputs)
+    output_path = os.path.join(os.path.dirname(output_path), entry.get("output", os.path.basename(output_path)))
+    if not os.path.exists(output_path):
+        return False
+    return os.path.getsize(output_path) == entry.get("size")
+
+def record_output(manifest, filename, key, output_path):
+    """Add a finished output to the manifest."""
+    manifest[filename] = {"key": key, "size": os.path.getsize(output_path), "output": os.path.basename(output_path)}
+
+def rename_outputs(output_dir, renames):
+    """
+    Follow renamed outputs in the manifest of an output directory.
+
+    Entries stay keyed by the input file name, so a re-run still finds them; only the recorded output
+    name changes.
+
+    Parameters:
+        output_dir (str): The output directory.
+        renames (dict): Old output file name -> new output file name.
+    """
+    manifest = load_manifest(output_dir)
+    changed = False
+    for filename, entry in manifest.items():
+        output = entry.get("output", filename)
+        if output in renames:
+            entry["output"] = renames[output]
+            changed = True
+    if changed:
+        save_manifest(output_dir, manifest)
+
+def temp_output_path(output_path):
+    """
+    Return the path to write an output to before it is finished.
+
+    The extension is kept so cv2.VideoWriter still picks the right container.
+    """
+    directory, filename = os.path.split(output_path)
+    name, extension = os.path.splitext(filename)
+    return os.path.join(directory, f".{name}{PARTIAL_MARKER}{extension}")
+
+def commit_output(temp_path, output_path):
+    """
+    Move a finished temp output into place with an atomic rename.
+
+    Returns:
+        bool: False if nothing (or an empty file) was written, e.g. because the input could not be opened.
+    """
+    if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    os.replace(temp_path, output_path)
+    return True
+
+def remove_partial_outputs(output_dir, filenames):
+    """
+    Delete temp outputs an interrupted run left behind for the given output file names.
+
+    Only the temp names of these outputs are touched, so another run or worker writing other files
+    into the same directory keeps its temp files.
+    """
+    for filename in filenames:
+        temp_path = temp_output_path(os.path.join(output_dir, filename))
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
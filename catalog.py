@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+from cache import _describe
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    frame_count INTEGER,
+    class TEXT,
+    augmentation TEXT,
+    source_path TEXT,
+    params TEXT,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_directory ON videos (directory);
+CREATE INDEX IF NOT EXISTS videos_class ON videos (class, augmentation);
+CREATE INDEX IF NOT EXISTS videos_source ON videos (source_path);
+"""
+
+def _normalize(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def probe_video(path):
+    """
+    Read a video's container metadata without decoding any frames.
+
+    Parameters:
+        path (str): The path to the video file.
+
+    Returns:
+        dict: size, mtime_ns, width, height, fps and frame_count (None where the container cannot be opened).
+    """
+    stat = os.stat(path)
+    metadata = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "width": None, "height": None, "fps": None, "frame_count": None}
+    cap = cv2.VideoCapture(path)
+    if cap.isOpened():
+        metadata.update(width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                        fps=cap.get(cv2.CAP_PROP_FPS), frame_count=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    cap.release()
+    return metadata
+
+class Catalog:
+    """
+    A SQLite catalog of source and augmented videos: probed metadata, class, and augmentation lineage.
+
+    Source videos have no augmentation; an augmented video records the augmentation, its parameters and
+    the path of the video it was made from. Only the thread that opened the catalog may write to it.
+
+    Parameters:
+        db_path (str): The path to the SQLite database; created if it does not exist.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._connection = sqlite3.connect(db_path)
+        self._connection.row_factory = sqlite3.Row
+        # WAL lets loaders read while a run is still recording outputs
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _upsert(self, path, metadata, class_name=None, augmentation=None, source_path=None, params=None):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO videos (path, directory, size, mtime_ns, width, height, fps, frame_count, class, "
+            "augmentation, source_path, params, recorded) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, os.path.dirname(path), metadata["size"], metadata["mtime_ns"], metadata["width"], metadata["height"],
+             metadata["fps"], metadata["frame_count"], class_name, augmentation, source_path,
+             None if params is None else json.dumps(params, sort_keys=True, default=_describe), time.time()))
+
+    def scan(self, directory, class_name=None, extensions=(".mp4", ".mov", ".avi", ".mkv"), workers=8):
+        """
+        Bring the catalog up to date with a directory of videos.
+
+        Only files that are new or whose size or mtime changed are probed, on a thread pool (OpenCV releases
+        the GIL while opening containers); rows of files that are gone are removed. Existing class and
+        lineage information is kept for files that are re-probed.
+
+        Parameters:
+            directory (str): The directory to scan (not recursive).
+            class_name (str): The class of new videos. Default is None.
+            extensions (tuple): The file extensions to catalog. Default is (".mp4", ".mov", ".avi", ".mkv").
+            workers (int): The number of probing threads. Default is 8.
+
+        Returns:
+            int: The number of files probed.
+        """
+        directory = _normalize(directory)
+        known = {row["path"]: row for row in self._connection.execute(
+            "SELECT path, size, mtime_ns, class, augmentation, source_path, params FROM videos WHERE directory = ?",
+            (directory,))}
+
+        present = set()
+        changed = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(extensions) or not entry.is_file():
+                    continue
+                path = _normalize(entry.path)
+                present.add(path)
+                stat = entry.stat()
+                row = known.get(path)
+                if row is None or row["size"] != stat.st_size or row["mtime_ns"] != stat.st_mtime_ns:
+                    changed.append(path)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for path, metadata in zip(changed, executor.map(probe_video, changed)):
+                row = known.get(path)
+                if row is None:
+                    self._upsert(path, metadata, class_name)
+                else:
+                    self._upsert(path, metadata, row["class"] or class_name, row["augmentation"], row["source_path"],
+                                 json.loads(row["params"]) if row["params"] else None)
+
+        # Rows of other file types (catalogued by a scan with other extensions) are not this scan's to remove
+        gone = [(path,) for path in known if path.endswith(extensions) and path not in present]
+        self._connection.executemany("DELETE FROM videos WHERE path = ?", gone)
+        self._connection.commit()
+        return len(changed)
+
+    def record_output(self, output_path, source_path, augmentation, params=None, class_name=None):
+        """
+        Record an augmented video and where it came from.
+
+        Parameters:
+            output_path (str): The augmented video.
+            source_path (str): The video it was made from.
+            augmentation (str): The name of the augmentation.
+            params (dict): The augmentation parameters. Default is None.
+            class_name (str): The class; if None, it is taken from the source video's row. Default is None.
+        """
+        source_path = _normalize(source_path)
+        if class_name is None:
+            row = self._connection.execute("SELECT class FROM videos WHERE path = ?", (source_path,)).fetchone()
+            class_name = row["class"] if row else None
+        self._upsert(_normalize(output_path), probe_video(output_path), class_name, augmentation, source_path, params)
+        self._connection.commit()
+
+    def rename(self, old_path, new_path):
+        """Follow a file rename, keeping its metadata and lineage (and the lineage of videos made from it)."""
+        old_path, new_path = _normalize(old_path), _normalize(new_path)
+        self._connection.execute("UPDATE videos SET path = ?, directory = ? WHERE path = ?",
+                                 (new_path, os.path.dirname(new_path), old_path))
+        self._connection.execute("UPDATE videos SET source_path = ? WHERE source_path = ?", (new_path, old_path))
+        self._connection.commit()
+
+    def get(self, path):
+        """Return the row of one video as a dict, or None if it is not catalogued."""
+        row = self._connection.execute("SELECT * FROM videos WHERE path = ?", (_normalize(path),)).fetchone()
+        return dict(row) if row else None
+
+    def videos(self, directory=None, class_name=None, augmentation=None, sources_only=False):
+        """
+        Query catalogued videos instead of scanning directories and reopening containers.
+
+        Parameters:
+            directory (str): Only videos in this directory. Default is None.
+            class_name (str): Only videos of this class. Default is None.
+            augmentation (str): Only videos made by this augmentation. Default is None.
+            sources_only (bool): Only source (non-augmented) videos. Default is False.
+
+        Returns:
+            list: The matching rows as dicts, ordered by path.
+        """
+        conditions, values = [], []
+        if directory is not None:
+            conditions.append("directory = ?")
+            values.append(_normalize(directory))
+        if class_name is not None:
+            conditions.append("class = ?")
+            values.append(class_name)
+        if augmentation is not None:
+            conditions.append("augmentation = ?")
+            values.append(augmentation)
+        if sources_only:
+            conditions.append("augmentation IS NULL")
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return [dict(row) for row in self._connection.execute(f"SELECT * FROM videos{where} ORDER BY path", values)]
+
+    def lineage(self, path):
+        """
+        Follow an augmented video back to its source.
+
+        Returns:
+            list: The rows from the given video to the original source video.
+        """
+        chain = []
+        row = self.get(path)
+        while row is not None and len(chain) < 100:
+            chain.append(row)
+            row = self.get(row["source_path"]) if row["source_path"] else None
+        return chain
+
+if __name__ == "__main__":
+    data_root = "C:\\Users\\Wilbert\\Desktop\\data"
+
+    # Catalog the cleaned source videos of every class
+    with Catalog(os.path.join(data_root, "catalog.sqlite")) as catalog:
+        for class_name in ("assault", "shooting", "theft"):
+            probed = catalog.scan(os.path.join(data_root, "cleaned", class_name), class_name=class_name)
+            print(f"{class_name}: probed {probed} new or changed videos, "
+                  f"{len(catalog.videos(class_name=class_name, sources_only=True))} in the catalog.")
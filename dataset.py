@@ -0,0 +1,177 @@
+import copy
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import cv2
+import numpy as np
+
+from framestore import open_video
+from sampling import read_frames_at
+
+def list_videos(input_dir, extensions=(".mp4", ".mov")):
+    """Return the sorted paths of the videos in a directory."""
+    return sorted(os.path.join(input_dir, filename) for filename in os.listdir(input_dir)
+                  if filename.endswith(extensions))
+
+def sample_seed(seed, epoch, index=None):
+    """
+    Derive the seed for one sample from the dataset seed, the epoch and the sample index,
+    or with index=None the seed for the visiting order of the epoch.
+    """
+    entropy = [seed, epoch] if index is None else [seed, epoch, index, 1]
+    return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+@contextmanager
+def seeded_random_state(seed):
+    """
+    Seed the global random and np.random generators the per-frame functions draw from, and put back
+    their previous state on exit, so loading a clip in the training process leaves the caller's
+    random streams untouched.
+    """
+    python_state = random.getstate()
+    numpy_state = np.random.get_state()
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+
+def load_augmented_clip(video_path, transforms, clip_len, seed, stride=1):
+    """
+    Decode one clip from a video and apply the per-frame transforms to it.
+
+    The clip start is drawn from `seed`, and the random generators are seeded with it while the
+    transforms run (their previous state is restored afterwards), so the same (video, seed) always gives
+    the same clip. Each clip gets its own copy of the transforms, so stateful ones (PolicyTransform,
+    IncrementalSuperpixels, RandomDownsample) never carry a plan, mask or scale over from another clip.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+        transforms (list): Per-frame functions (frame -> frame) applied in order, e.g. apply_random_rotation.
+        clip_len (int): The number of frames in the clip. Short videos are padded by repeating the last frame.
+        seed (int): The sample seed.
+        stride (int): Take every `stride`-th frame; the skipped frames are never converted. Default is 1.
+
+    Returns:
+        numpy.ndarray: The (clip_len, H, W, C) uint8 clip.
+    """
+    transforms = copy.deepcopy(transforms)
+
+    cap = open_video(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file '{video_path}'")
+
+    frames = []
+    try:
+        with seeded_random_state(seed):
+            # Pick the clip start, then seek to it and skip the frames between the strided ones
+            num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            span = (clip_len - 1) * stride + 1
+            start = random.randrange(max(num_frames_total - span, 0) + 1)
+
+            for _, frame in read_frames_at(cap, range(start, start + span, stride)):
+                for transform in transforms:
+                    frame = transform(frame)
+                frames.append(frame)
+    finally:
+        cap.release()
+
+    if not frames:
+        raise IOError(f"No frames could be read from '{video_path}'")
+    frames.extend(frames[-1:] * (clip_len - len(frames)))
+    return np.stack(frames)
+
+class AugmentedClipDataset:
+    """
+    An iterable of augmented clips decoded straight from the source videos, with no intermediate files.
+
+    Clips are produced by a pool of worker processes with a bounded number of clips in flight, and every
+    clip is seeded from (seed, epoch, index), so an epoch is reproducible and each epoch differs.
+
+    Parameters:
+        video_paths (list): The source videos (see list_videos).
+        transforms (list): Per-frame functions (frame -> frame) applied in order. Must be module-level
+            functions, functools.partial objects or callable objects (copied for every clip) so they can be
+            sent to worker processes.
+        clip_len (int): The number of frames per clip. Default is 16.
+        stride (int): Take every `stride`-th frame of the source. Default is 1.
+        clips_per_video (int): The number of clips drawn from each video per epoch. Default is 1.
+        num_workers (int): The number of worker processes; 0 decodes in this process. Default is 4.
+        prefetch (int): The number of clips in flight per worker. Default is 2.
+        seed (int): The dataset seed. Default is 0.
+        shuffle (bool): Visit the samples in a new seeded order every epoch. Default is True.
+    """
+
+    def __init__(self, video_paths, transforms, clip_len=16, stride=1, clips_per_video=1, num_workers=4, prefetch=2,
+                 seed=0, shuffle=True):
+        self.video_paths = list(video_paths)
+        self.transforms = list(transforms)
+        self.clip_len = clip_len
+        self.stride = stride
+        self.clips_per_video = clips_per_video
+        self.num_workers = num_workers
+        self.prefetch = prefetch
+        self.seed = seed
+        self.shuffle = shuffle
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        """Select the epoch whose seeds the next iteration uses."""
+        self.epoch = epoch
+
+    def __len__(self):
+        return len(self.video_paths) * self.clips_per_video
+
+    def _samples(self):
+        indices = list(range(len(self)))
+        if self.shuffle:
+            random.Random(sample_seed(self.seed, self.epoch)).shuffle(indices)
+        for index in indices:
+            video_path = self.video_paths[index // self.clips_per_video]
+            yield video_path, sample_seed(self.seed, self.epoch, index)
+
+    def __iter__(self):
+        """Yield (clip, video_path) pairs for the current epoch, in a deterministic order."""
+        if self.num_workers == 0:
+            for video_path, seed in self._samples():
+                yield load_augmented_clip(video_path, self.transforms, self.clip_len, seed, self.stride), video_path
+            return
+
+        # Keep at most num_workers * prefetch clips in flight so a slow consumer does not pile up memory
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            in_flight = deque()
+            samples = self._samples()
+            for video_path, seed in samples:
+                in_flight.append((executor.submit(load_augmented_clip, video_path, self.transforms,
+                                                  self.clip_len, seed, self.stride), video_path))
+                if len(in_flight) >= self.num_workers * self.prefetch:
+                    break
+
+            while in_flight:
+                future, video_path = in_flight.popleft()
+                clip = future.result()
+                next_sample = next(samples, None)
+                if next_sample is not None:
+                    in_flight.append((executor.submit(load_augmented_clip, next_sample[0], self.transforms,
+                                                      self.clip_len, next_sample[1], self.stride), next_sample[0]))
+                yield clip, video_path
+
+if __name__ == "__main__":
+    from functools import partial
+    from ranrot import apply_random_rotation
+    from mul import apply_random_multiply
+    from salt import apply_salt_effect
+
+    input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\shooting"
+
+    dataset = AugmentedClipDataset(list_videos(input_dir),
+                                   [apply_random_rotation, apply_random_multiply, partial(apply_salt_effect, saltiness=0.01)],
+                                   clip_len=16, num_workers=4)
+    for epoch in range(2):
+        dataset.set_epoch(epoch)
+        for clip, video_path in dataset:
+            print(f"Epoch {epoch}: clip {clip.shape} from {video_path}")
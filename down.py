@@ -1,20 +1,66 @@
-import os
 import cv2
 import numpy as np
 import random
+from parallel import process_directory
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
 
-def apply_random_downsample(frame):
-    # Define random scale factors for downsampling
-    scale_factor = random.uniform(0.5, 1.0)
-    
-    # Resize the frame using the scale factor
-    downsized_frame = cv2.resize(frame, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_LINEAR)
-    
-    return downsized_frame
+def scaled_size(width, height, scale):
+    # The (width, height) of a frame downsampled by `scale`, at least one pixel each way
+    return max(1, int(width * scale + 0.5)), max(1, int(height * scale + 0.5))
+
+def downsample_frame(frame, scale, output_size=None):
+    height, width = frame.shape[:2]
+    target_width, target_height = scaled_size(width, height, scale)
+
+    # Halve with pyrDown (blur + decimate, no aliasing) while the target is at most half the current size;
+    # the last halving snaps straight onto the target when it is within pyrDown's one-pixel rounding
+    while frame.shape[1] >= 2 * target_width - 1 and frame.shape[0] >= 2 * target_height - 1:
+        current_height, current_width = frame.shape[:2]
+        if abs(2 * target_width - current_width) <= 2 and abs(2 * target_height - current_height) <= 2:
+            frame = cv2.pyrDown(frame, dstsize=(target_width, target_height))
+            break
+        frame = cv2.pyrDown(frame)
+
+    # Finish the non power-of-two part with area averaging
+    if (frame.shape[1], frame.shape[0]) != (target_width, target_height):
+        frame = cv2.resize(frame, (target_width, target_height), interpolation=cv2.INTER_AREA)
+
+    # Fit the result onto the fixed output canvas
+    if output_size is not None and (target_width, target_height) != tuple(output_size):
+        shrinking = output_size[0] < target_width
+        frame = cv2.resize(frame, tuple(output_size), interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+
+    return frame
+
+class RandomDownsample:
+    # Per-frame random downsample for frame-level callers (fanout, pipeline). The scale is drawn in
+    # [min_scale, max_scale] on the first frame and then kept, so every frame of a clip has the same size
+    # and the writer, opened at the first frame's size, takes them all. Use one instance per clip.
+
+    def __init__(self, min_scale=0.5, max_scale=1.0):
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.scale = None
+
+    def __call__(self, frame):
+        # Define the random scale factor for downsampling once per clip
+        if self.scale is None:
+            self.scale = random.uniform(self.min_scale, self.max_scale)
+
+        # Resize the frame using the scale factor
+        return downsample_frame(frame, self.scale)
+
+def apply_random_downsample_to_video(video_path, output_path, num_frames=None, scale=None, scale_schedule=None, canvas_size=None):
+    # One scale for the whole clip (random in [0.5, 1.0] unless given), or a per-frame schedule of scales
+    # that holds its last value. Every frame lands on the same canvas, by default the clip's downsampled
+    # size (the largest scale of a schedule), so the writer always gets frames of the size it was opened with.
+    if scale_schedule is None:
+        scale_schedule = [random.uniform(0.5, 1.0) if scale is None else scale]
 
-def apply_random_downsample_to_video(video_path, output_path, num_frames=None):
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Check if the video file was successfully opened
     if not cap.isOpened():
@@ -31,52 +77,41 @@ def apply_random_downsample_to_video(video_path, output_path, num_frames=None):
     if num_frames is None:
         num_frames = num_frames_total
 
+    # Determine the output canvas
+    if canvas_size is None:
+        canvas_size = scaled_size(width, height, max(scale_schedule))
+
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (int(width * 0.5), int(height * 0.5)))
+    out = open_video_writer(output_path, fps, canvas_size)
 
     # Check if the output video file was successfully created
     if not out.isOpened():
         print(f"Error: Could not create output video file '{output_path}'")
         return
 
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
-            break
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
+                break
 
-        # Apply random downsample transformation
-        downsized_frame = apply_random_downsample(frame)
+            # Apply the downsample for this frame
+            frame_scale = scale_schedule[min(i, len(scale_schedule) - 1)]
+            downsized_frame = telemetry.timed("transformed", downsample_frame, frame, frame_scale, canvas_size)
 
-        # Check if downsized frame has data
-        if downsized_frame is None:
-            print(f"Warning: Skipping empty frame {i + 1} in video '{video_path}'.")
-            continue
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, downsized_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-        # Write the transformed frame to the output video
-        out.write(downsized_frame)
-
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
-
-    # Release video capture and writer
-    cap.release()
-    out.release()
-
-def process_videos_in_directory(input_dir, output_dir):
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply random downsample to the video
-            apply_random_downsample_to_video(input_video_path, output_video_path)
-            print(f"Random downsample applied to {filename}.")
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None, scale=None, canvas_size=None):
+    # Apply random downsample to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_random_downsample_to_video, label="Random downsample", workers=workers, seed=seed,
+                      scale=scale, canvas_size=canvas_size)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\shooting"
@@ -0,0 +1,162 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import cv2
+import numpy as np
+
+# Which backend open_video_writer uses: "auto" (ffmpeg when it is on the PATH, else OpenCV), "ffmpeg" or "opencv".
+# Set with configure_encoder or the VIDEO_AUG_ENCODER* environment variables (inherited by worker processes).
+_settings = {
+    "backend": os.environ.get("VIDEO_AUG_ENCODER", "auto"),
+    "ffmpeg": os.environ.get("VIDEO_AUG_FFMPEG", "ffmpeg"),
+    "codec": os.environ.get("VIDEO_AUG_ENCODER_CODEC", "libx264"),
+    "preset": os.environ.get("VIDEO_AUG_ENCODER_PRESET", "ultrafast"),
+    "crf": int(os.environ.get("VIDEO_AUG_ENCODER_CRF", 23)),
+    "threads": int(os.environ.get("VIDEO_AUG_ENCODER_THREADS", 0)),
+}
+
+_ENVIRONMENT_NAMES = {
+    "backend": "VIDEO_AUG_ENCODER",
+    "ffmpeg": "VIDEO_AUG_FFMPEG",
+    "codec": "VIDEO_AUG_ENCODER_CODEC",
+    "preset": "VIDEO_AUG_ENCODER_PRESET",
+    "crf": "VIDEO_AUG_ENCODER_CRF",
+    "threads": "VIDEO_AUG_ENCODER_THREADS",
+}
+
+# Codecs that understand -preset and -crf
+_X26X_CODECS = ("libx264", "libx265")
+
+def configure_encoder(**settings):
+    """
+    Change the encoder defaults for this process and the worker processes it starts.
+
+    Parameters:
+        backend (str): "auto", "ffmpeg" or "opencv".
+        ffmpeg (str): The ffmpeg executable.
+        codec (str): The ffmpeg video codec, e.g. "libx264".
+        preset (str): The x264/x265 preset, e.g. "ultrafast" or "medium".
+        crf (int): The x264/x265 constant rate factor (lower is better quality and bigger files).
+        threads (int): The encoder thread count; 0 lets ffmpeg choose.
+    """
+    for name, value in settings.items():
+        if name not in _settings:
+            raise TypeError(f"Unknown encoder setting '{name}'")
+        _settings[name] = value
+        os.environ[_ENVIRONMENT_NAMES[name]] = str(value)
+
+class FFmpegWriter:
+    """
+    A cv2.VideoWriter look-alike that streams raw BGR frames over a pipe to a local ffmpeg process.
+
+    Every frame must have the size the writer was opened with; unlike cv2.VideoWriter, a mismatched
+    frame raises instead of being dropped silently.
+    """
+
+    def __init__(self, output_path, fps, frame_size, ffmpeg="ffmpeg", codec="libx264", preset="ultrafast", crf=23,
+                 threads=0):
+        self._output_path = output_path
+        self._frame_shape = (frame_size[1], frame_size[0], 3)
+        width, height = frame_size
+
+        command = [ffmpeg, "-y", "-loglevel", "error",
+                   "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                   "-an", "-c:v", codec]
+        if codec in _X26X_CODECS:
+            command += ["-preset", preset, "-crf", str(crf)]
+        command += ["-threads", str(threads), "-pix_fmt", "yuv420p"]
+        # yuv420p needs even dimensions
+        if width % 2 or height % 2:
+            command += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        command.append(output_path)
+
+        # stderr goes to a file rather than a pipe: nothing reads it while frames are written, and a full
+        # pipe would block ffmpeg (and then the writer) on a long run with many errors
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                             stderr=self._stderr)
+        except OSError:
+            self._process = None
+            self._stderr.close()
+
+    def isOpened(self):
+        return self._process is not None and self._process.poll() is None
+
+    def write(self, frame):
+        if frame.shape != self._frame_shape:
+            raise ValueError(f"Frame of shape {frame.shape} written to '{self._output_path}', "
+                             f"which was opened for {self._frame_shape}")
+        try:
+            # Hand ffmpeg the frame's buffer directly instead of a bytes copy
+            self._process.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError):
+            raise IOError(f"ffmpeg stopped while writing '{self._output_path}': {self._error_output()}")
+
+    def _error_output(self):
+        self._process.wait()
+        self._stderr.seek(0)
+        return self._stderr.read().decode("utf-8", "replace").strip()
+
+    def release(self):
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        # A failed encode must not look finished: raise, so the caller drops the temp output
+        error = self._error_output() if self._process.wait() != 0 else None
+        self._stderr.close()
+        self._process = None
+        if error is not None:
+            raise IOError(f"ffmpeg failed to encode '{self._output_path}': {error}")
+
+def release_all(writers):
+    """
+    Release every writer in a list (None entries are skipped), even if releasing one of them fails.
+
+    Raises:
+        IOError: The first error raised by a writer, after all of them were released.
+    """
+    errors = []
+    for writer in writers:
+        if writer is not None:
+            try:
+                writer.release()
+            except IOError as e:
+                errors.append(e)
+    if errors:
+        raise errors[0]
+
+def open_video_writer(output_path, fps, frame_size, backend=None, fourcc="mp4v", **options):
+    """
+    Open a video writer with the configured encoder backend.
+
+    Parameters:
+        output_path (str): The path to save the output video file.
+        fps (float): The frame rate.
+        frame_size (tuple): The frame size as (width, height).
+        backend (str): "auto", "ffmpeg" or "opencv". If None, use the configured backend. Default is None.
+        fourcc (str): The codec of the OpenCV backend. Default is "mp4v".
+        **options: ffmpeg settings (ffmpeg, codec, preset, crf, threads) overriding the configured ones.
+
+    Returns:
+        FFmpegWriter or cv2.VideoWriter: An object with the VideoWriter isOpened/write/release interface.
+    """
+    backend = backend or _settings["backend"]
+    settings = {name: value for name, value in _settings.items() if name != "backend"}
+    settings.update(options)
+
+    if backend == "auto":
+        backend = "ffmpeg" if shutil.which(settings["ffmpeg"]) else "opencv"
+    if backend == "ffmpeg":
+        writer = FFmpegWriter(output_path, fps, frame_size, **settings)
+        if writer.isOpened() or _settings["backend"] == "ffmpeg":
+            return writer
+        # ffmpeg is there but would not start; fall back rather than lose the output
+    elif backend != "opencv":
+        raise ValueError(f"Unknown encoder backend '{backend}'")
+
+    return cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, tuple(frame_size))
@@ -0,0 +1,169 @@
+import copy
+import os
+import cv2
+from functools import partial
+
+from add import apply_add_effect
+from mul import apply_random_multiply
+from salt import apply_salt_effect
+from pepper import apply_pepper_effect
+from gaussianblur import apply_gaussian_blur_effect
+from invertcolor import invert_colors
+from ranrot import apply_random_rotation
+from shear import apply_static_shear_effect
+from superpix import apply_superpixel_effect
+from apa import apply_piecewise_affine_effect
+from pipeline import run_frame_pipeline
+from parallel import process_directory
+from framestore import open_video
+from encoder import open_video_writer, release_all
+
+def apply_transforms_to_video(video_path, outputs, num_frames=None):
+    """
+    Decode each frame of the input video once and hand it to every registered transform,
+    each of which writes to its own output video.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+        outputs (dict): Mapping of output video path to a per-frame function (frame -> frame).
+        num_frames (int): The number of frames to process. If None, process all frames. Default is None.
+    """
+    # Open video file
+    cap = open_video(video_path)
+
+    # Check if the video file was successfully opened
+    if not cap.isOpened():
+        print(f"Error: Could not open video file '{video_path}'")
+        return
+
+    # Get video properties
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # Determine the number of frames to process
+    if num_frames is None:
+        num_frames = num_frames_total
+
+    # Stateful transforms (RandomDownsample, PolicyTransform, IncrementalSuperpixels) start afresh for every clip
+    transforms = [(output_path, copy.deepcopy(transform)) for output_path, transform in outputs.items()]
+
+    # Writers are opened lazily at the size of the first transformed frame,
+    # so transforms that change the frame size get a matching writer
+    writers = [None] * len(transforms)
+    frame_shapes = [None] * len(transforms)
+    failed = set()
+
+    def fail(j, message):
+        # Give up on this output only; its temp file is removed so it is reported missing, not committed
+        print(message)
+        failed.add(j)
+        try:
+            release_all([writers[j]])
+        except IOError:
+            pass
+        writers[j] = None
+        if os.path.exists(transforms[j][0]):
+            os.remove(transforms[j][0])
+
+    def transform_all(frame):
+        transformed_frames = []
+        for j, (output_path, transform) in enumerate(transforms):
+            # Some transforms (salt, pepper) modify the frame in place, so every
+            # transform but the last one gets its own copy of the decoded frame
+            source = frame if j == len(transforms) - 1 else frame.copy()
+            transformed_frames.append(transform(source))
+        return transformed_frames
+
+    def write_all(transformed_frames):
+        for j, transformed_frame in enumerate(transformed_frames):
+            output_path = transforms[j][0]
+            if j in failed:
+                continue
+            if transformed_frame is None:
+                print(f"Warning: Skipping empty frame for output '{output_path}'.")
+                continue
+
+            if writers[j] is None:
+                height, width = transformed_frame.shape[:2]
+                writers[j] = open_video_writer(output_path, fps, (width, height))
+                frame_shapes[j] = transformed_frame.shape
+                if not writers[j].isOpened():
+                    fail(j, f"Error: Could not create output video file '{output_path}'")
+                    continue
+            elif transformed_frame.shape != frame_shapes[j]:
+                # cv2.VideoWriter drops frames of another size without an error, which would leave a short clip
+                fail(j, f"Error: Frame {transformed_frame.shape} does not match {frame_shapes[j]} for output '{output_path}'")
+                continue
+
+            # Write the transformed frame to its output video
+            writers[j].write(transformed_frame)
+
+    # Decode, transform and encode on separate threads
+    try:
+        frames_processed = run_frame_pipeline(cap.read, transform_all, write_all, num_frames)
+    finally:
+        # Release video capture and writers
+        cap.release()
+        release_all(writers)
+
+    print(f"Processed {frames_processed}/{num_frames_total} frames for video {video_path}")
+
+def apply_transforms_to_paths(video_path, output_paths, transforms, num_frames=None):
+    """
+    apply_transforms_to_video with the outputs as parallel lists, the form process_directory calls for a fan-out.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+        output_paths (list): The output video paths.
+        transforms (list): The per-frame function for each output path.
+        num_frames (int): The number of frames to process. If None, process all frames. Default is None.
+    """
+    apply_transforms_to_video(video_path, dict(zip(output_paths, transforms)), num_frames=num_frames)
+
+def process_videos_in_directory(input_dir, output_dirs, *, num_frames=None, workers=1, seed=None):
+    """
+    Apply every registered transform to all videos in the input directory, decoding each video once.
+
+    Runs through parallel.process_directory, so files can be spread over worker processes, are seeded
+    per file, are skipped when all their outputs are up to date, and every output is written to a temp
+    name first. A file whose outputs did not all get written is reported as failed.
+
+    Parameters:
+        input_dir (str): The path to the input directory containing video files.
+        output_dirs (dict): Mapping of output directory to a per-frame function (frame -> frame).
+            The functions must be picklable (module-level functions or partials of them) when workers > 1.
+        num_frames (int): The number of frames to process. If None, process all frames. Default is None.
+        workers (int): The number of worker processes. Default is 1 (one file at a time).
+        seed (int): The base random seed. If None, the random generators are left untouched. Default is None.
+
+    Returns:
+        list: The file names that failed.
+    """
+    return process_directory(input_dir, list(output_dirs), apply_transforms_to_paths,
+                             label=f"{len(output_dirs)} augmentations", workers=workers, seed=seed,
+                             transforms=list(output_dirs.values()), num_frames=num_frames)
+
+if __name__ == "__main__":
+    class_name = "shooting"
+    input_dir = f"C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\{class_name}"
+    output_root = "C:\\Users\\Wilbert\\Desktop\\data\\augmented"
+
+    # Output folder suffix -> per-frame transform, following the augmented/<class><op> layout
+    transforms = {
+        "add": partial(apply_add_effect, value=50),
+        "multiply": apply_random_multiply,
+        "salt": partial(apply_salt_effect, saltiness=0.01),
+        "pepper": partial(apply_pepper_effect, pepperness=0.01),
+        "gaus": apply_gaussian_blur_effect,
+        "in": invert_colors,
+        "rot": apply_random_rotation,
+        "staticshear": partial(apply_static_shear_effect, shear_factor=0.2),
+        "pix": apply_superpixel_effect,
+        "apa": apply_piecewise_affine_effect,
+    }
+    output_dirs = {os.path.join(output_root, class_name + suffix): transform for suffix, transform in transforms.items()}
+
+    # Process all videos in the input directory
+    process_videos_in_directory(input_dir, output_dirs)
+
+    print("All videos processed successfully.")
@@ -1,11 +1,16 @@
 import os
 import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from cache import input_fingerprint
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
 
 def copy_videos(source_path, destination_path):
     # Recursively scan all directories and files in the source path
     for root, _, files in os.walk(source_path):
         for file in files:
-            if file.endswith(('.mp4', '.avi', '.mkv', '.mov')):
+            if file.endswith(VIDEO_EXTENSIONS):
                 source_file_path = os.path.join(root, file)
                 destination_file_path = os.path.join(destination_path, file)
 
@@ -16,12 +21,88 @@ def copy_videos(source_path, destination_path):
                 except PermissionError as e:
                     print(f"Permission error for {file}: {e}")
 
+def plan_destinations(source_path, destination_path, extensions=VIDEO_EXTENSIONS):
+    # Map every video under source_path to a file name in destination_path. The walk is sorted, so the
+    # plan is the same on every run: the first file with a given name keeps it, and later files with the
+    # same name get a suffix derived from their relative path instead of overwriting it.
+    plan = []
+    taken = set()
+    for root, dirs, files in os.walk(source_path):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.endswith(extensions):
+                continue
+            source_file_path = os.path.join(root, file)
+            name, extension = os.path.splitext(file)
+            destination_name = file
+            if destination_name.lower() in taken:
+                relative_path = os.path.relpath(source_file_path, source_path).replace(os.sep, "/")
+                destination_name = f"{name}_{zlib.crc32(relative_path.encode('utf-8')):08x}{extension}"
+            taken.add(destination_name.lower())
+            plan.append((source_file_path, os.path.join(destination_path, destination_name)))
+    return plan
+
+def is_already_ingested(source_file_path, destination_file_path, hash_contents=False):
+    # The destination is current if it is the same file (a hard link) or matches in size and mtime (or hash)
+    if not os.path.exists(destination_file_path):
+        return False
+    if os.path.samefile(source_file_path, destination_file_path):
+        return True
+    return input_fingerprint(source_file_path, hash_contents) == input_fingerprint(destination_file_path, hash_contents)
+
+def link_or_copy(source_file_path, destination_file_path, link=True):
+    # Hard-link when source and destination are on the same filesystem (no data is copied), otherwise
+    # copy to a temp name and rename, so an interrupted copy never looks finished. Returns "linked" or "copied".
+    temp_path = destination_file_path + ".partial"
+    if link and os.stat(source_file_path).st_dev == os.stat(os.path.dirname(destination_file_path)).st_dev:
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            os.link(source_file_path, temp_path)
+            os.replace(temp_path, destination_file_path)
+            return "linked"
+        except OSError:
+            # Filesystem without hard links (e.g. FAT/exFAT); copy instead
+            pass
+
+    shutil.copy2(source_file_path, temp_path)
+    os.replace(temp_path, destination_file_path)
+    return "copied"
+
+def ingest_videos(source_path, destination_path, workers=8, link=True, hash_contents=False, extensions=VIDEO_EXTENSIONS):
+    # Parallel, re-runnable version of copy_videos: name collisions get deterministic names, files that are
+    # already in place are skipped, and the rest are hard-linked or copied on a thread pool
+    os.makedirs(destination_path, exist_ok=True)
+    plan = plan_destinations(source_path, destination_path, extensions)
+
+    def ingest(item):
+        source_file_path, destination_file_path = item
+        try:
+            if is_already_ingested(source_file_path, destination_file_path, hash_contents):
+                return "skipped"
+            result = link_or_copy(source_file_path, destination_file_path, link)
+            print(f"{result.capitalize()}: {source_file_path} -> {os.path.basename(destination_file_path)}")
+            return result
+        except OSError as e:
+            print(f"Error ingesting {source_file_path}: {e}")
+            return "failed"
+
+    counts = {"linked": 0, "copied": 0, "skipped": 0, "failed": 0}
+    # Copies are I/O bound and shutil releases the GIL, so threads are enough
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(ingest, plan):
+            counts[result] += 1
+
+    print(f"Ingested {len(plan)} videos: {counts['linked']} linked, {counts['copied']} copied, "
+          f"{counts['skipped']} already up to date, {counts['failed']} failed.")
+    return counts
+
 if __name__ == "__main__":
     # Define source and destination paths
     FILEPATH = r'F:\DATASETS\UCF\Anomaly-Videos-Part-3\Anomaly-Videos-Part-3\Shooting'
     FILEDESTINATION = r'F:\data\shooting'
 
-    # Copy videos from source to destination
-    copy_videos(FILEPATH, FILEDESTINATION)
+    # Copy videos from source to destination, skipping what an earlier run already brought over
+    ingest_videos(FILEPATH, FILEDESTINATION)
 
 
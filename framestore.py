@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import cv2
+import numpy as np
+
+from cache import input_fingerprint
+
+# Where decoded frames are kept; None disables the store. Set with configure_frame_store or the
+# VIDEO_AUG_FRAME_STORE / VIDEO_AUG_FRAME_STORE_MAX_GB environment variables (inherited by worker processes).
+_store_dir = os.environ.get("VIDEO_AUG_FRAME_STORE") or None
+_max_bytes = int(float(os.environ.get("VIDEO_AUG_FRAME_STORE_MAX_GB", 50)) * 1024 ** 3)
+
+def configure_frame_store(store_dir, max_gb=50):
+    """
+    Enable (or with store_dir=None, disable) the decoded-frame store for this process.
+
+    Parameters:
+        store_dir (str): The directory for the raw frame files, ideally on local NVMe.
+        max_gb (float): The size cap; least recently used sources are evicted beyond it. Default is 50.
+    """
+    global _store_dir, _max_bytes
+    _store_dir = store_dir
+    _max_bytes = int(max_gb * 1024 ** 3)
+    # Keep worker processes in line with this process
+    if store_dir is None:
+        os.environ.pop("VIDEO_AUG_FRAME_STORE", None)
+    else:
+        os.environ["VIDEO_AUG_FRAME_STORE"] = store_dir
+        os.environ["VIDEO_AUG_FRAME_STORE_MAX_GB"] = str(max_gb)
+
+class MemmapCapture:
+    """
+    A cv2.VideoCapture look-alike that serves frames from a memory-mapped raw uint8 array.
+
+    The mapping is read-only and shared through the page cache, so many workers can map the same source
+    without each growing its own memory. Each frame read is copied out of it (into `image` when given,
+    like cv2.VideoCapture.read), so transforms that modify a frame in place (salt, pepper) never write
+    to the mapping; a copy-on-write mapping would keep every touched page as private memory.
+    """
+
+    def __init__(self, raw_path, meta):
+        self._meta = meta
+        self._frames = np.memmap(raw_path, dtype=np.uint8, mode="r", shape=tuple(meta["shape"]))
+        self._position = 0
+
+    def isOpened(self):
+        return self._frames is not None
+
+    def grab(self):
+        if self._frames is None or self._position >= len(self._frames):
+            return False
+        self._position += 1
+        return True
+
+    def retrieve(self, image=None):
+        if self._frames is None or self._position == 0:
+            return False, None
+        frame = self._frames[self._position - 1]
+        if image is not None:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame.copy()
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        frame_count, height, width = self._meta["shape"][:3]
+        values = {
+            cv2.CAP_PROP_FRAME_WIDTH: width,
+            cv2.CAP_PROP_FRAME_HEIGHT: height,
+            cv2.CAP_PROP_FPS: self._meta["fps"],
+            cv2.CAP_PROP_FRAME_COUNT: frame_count,
+            cv2.CAP_PROP_POS_FRAMES: self._position,
+        }
+        return float(values.get(prop, 0.0))
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self._position = int(min(max(value, 0), len(self._frames)))
+            return True
+        return False
+
+    def release(self):
+        self._frames = None
+
+def _entry_paths(video_path):
+    fingerprint = input_fingerprint(video_path)
+    key = hashlib.sha1(json.dumps([os.path.abspath(video_path), fingerprint]).encode("utf-8")).hexdigest()
+    return os.path.join(_store_dir, key + ".raw"), os.path.join(_store_dir, key + ".json")
+
+def _store_entries():
+    # (last used, size, raw path, meta path) for every complete entry
+    entries = []
+    for filename in os.listdir(_store_dir):
+        if filename.endswith(".json"):
+            meta_path = os.path.join(_store_dir, filename)
+            raw_path = meta_path[:-len(".json")] + ".raw"
+            if os.path.exists(raw_path):
+                entries.append((os.path.getmtime(meta_path), os.path.getsize(raw_path), raw_path, meta_path))
+    return entries
+
+def _evict(needed_bytes):
+    """Remove least recently used entries until `needed_bytes` more fit under the cap."""
+    entries = sorted(_store_entries())
+    total = sum(size for _, size, _, _ in entries)
+    for _, size, raw_path, meta_path in entries:
+        if total + needed_bytes <= _max_bytes:
+            break
+        try:
+            os.remove(meta_path)
+            os.remove(raw_path)
+            total -= size
+        except OSError:
+            # Still mapped by another process on Windows; try the next one
+            continue
+    return total + needed_bytes <= _max_bytes
+
+def _populate(video_path, raw_path, meta_path):
+    """Decode a source once into the store. Returns False if it does not fit under the cap."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return False
+
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    estimated_bytes = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) * width * height * 3
+    if estimated_bytes > _max_bytes or not _evict(estimated_bytes):
+        cap.release()
+        return False
+
+    # Append raw frames to a private temp file, then publish it with a rename
+    temp_path = f"{raw_path}.{os.getpid()}.partial"
+    frame_count = 0
+    frame_shape = (height, width, 3)
+    with open(temp_path, "wb") as f:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_shape = frame.shape
+            f.write(frame.tobytes())
+            frame_count += 1
+    cap.release()
+
+    if frame_count == 0:
+        os.remove(temp_path)
+        return False
+
+    os.replace(temp_path, raw_path)
+    meta = {"source": os.path.abspath(video_path), "fps": fps, "shape": [frame_count, *frame_shape]}
+    temp_meta_path = f"{meta_path}.{os.getpid()}.partial"
+    with open(temp_meta_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(temp_meta_path, meta_path)
+    return True
+
+def open_video(video_path):
+    """
+    Open a video for reading, through the decoded-frame store when it is enabled.
+
+    The first open of a source decodes it once into a raw uint8 file with a JSON sidecar (fps, shape,
+    frame count); later opens map that file instead of decoding. Without a store, or when the source
+    does not fit under the size cap, this is plain cv2.VideoCapture.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+
+    Returns:
+        cv2.VideoCapture or MemmapCapture: An object with the VideoCapture read/get/set/release interface.
+    """
+    if _store_dir is None or not os.path.exists(video_path):
+        return cv2.VideoCapture(video_path)
+
+    os.makedirs(_store_dir, exist_ok=True)
+    raw_path, meta_path = _entry_paths(video_path)
+    if not (os.path.exists(meta_path) and os.path.exists(raw_path)):
+        if not _populate(video_path, raw_path, meta_path):
+            return cv2.VideoCapture(video_path)
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        capture = MemmapCapture(raw_path, meta)
+    except (OSError, ValueError):
+        # Evicted by another process in the meantime
+        return cv2.VideoCapture(video_path)
+
+    # Mark the entry as recently used for LRU eviction
+    os.utime(meta_path)
+    return capture
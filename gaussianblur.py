@@ -1,9 +1,24 @@
-import os
 import cv2
+from parallel import process_directory
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer, release_all
+from blur import gaussian_blur, gaussian_blur_levels, ksize_to_sigma
 
-def apply_gaussian_blur(video_path, output_path, num_frames=None):
+def apply_gaussian_blur_effect(frame, ksize=(15, 15), mode="exact"):
+    # Apply Gaussian blur transformation; mode="fast" approximates it with box filters (see blur.py)
+    if mode == "exact":
+        return cv2.GaussianBlur(frame, ksize, 0)
+    return gaussian_blur(frame, ksize_to_sigma(ksize[0]), mode)
+
+def apply_gaussian_blur(video_path, output_path, num_frames=None, ksize=(15, 15), mode="exact"):
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
+
+    # Check if the video file was successfully opened
+    if not cap.isOpened():
+        print(f"Error: Could not open video file '{video_path}'")
+        return
     
     # Get video properties
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -16,45 +31,100 @@ def apply_gaussian_blur(video_path, output_path, num_frames=None):
         num_frames = num_frames_total
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    out = open_video_writer(output_path, fps, (width, height))
 
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # Check if the output video file was successfully created
+    if not out.isOpened():
+        print(f"Error: Could not create output video file '{output_path}'")
+        cap.release()
+        return
 
-        # Apply Gaussian blur transformation
-        blurred_frame = cv2.GaussianBlur(frame, (15, 15), 0)
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                break
 
-        # Write the transformed frame to the output video
-        out.write(blurred_frame)
+            # Apply Gaussian blur transformation
+            blurred_frame = telemetry.timed("transformed", apply_gaussian_blur_effect, frame, ksize, mode)
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, blurred_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
+def apply_gaussian_blur_sweep(video_path, output_paths, num_frames=None, mode="exact"):
+    # Blur every frame at several strengths in one decode pass. output_paths maps sigma -> output video;
+    # each level is blurred from the previous one (sigma composition) instead of from the original frame
+    sigmas = list(output_paths)
 
-def process_videos_in_directory(input_dir, output_dir):
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Print the list of files in the input directory
-    print("Files found in input directory:")
-    for filename in os.listdir(input_dir):
-        print(filename)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4", ".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply Gaussian Blur to the video
-            apply_gaussian_blur(input_video_path, output_video_path)
-            print(f"Gaussian Blur applied to {filename}.")
+    # Open video file
+    cap = open_video(video_path)
+
+    # Check if the video file was successfully opened
+    if not cap.isOpened():
+        print(f"Error: Could not open video file '{video_path}'")
+        return
+
+    # Get video properties
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # Determine the number of frames to process
+    if num_frames is None:
+        num_frames = num_frames_total
+
+    # Create one output video per blur strength; an output that cannot be created is skipped, the others still run
+    writers = []
+    for sigma in sigmas:
+        out = open_video_writer(output_paths[sigma], fps, (width, height))
+        if not out.isOpened():
+            print(f"Error: Could not create output video file '{output_paths[sigma]}'")
+            out = None
+        writers.append(out)
+    if all(out is None for out in writers):
+        cap.release()
+        return
+
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                break
+
+            # Apply every blur strength
+            blurred_frames = telemetry.timed("transformed", gaussian_blur_levels, frame, sigmas, mode)
+
+            # Write each level to its output video
+            for out, blurred_frame in zip(writers, blurred_frames):
+                if out is not None:
+                    telemetry.timed("encoded", out.write, blurred_frame)
+    finally:
+        # Release video capture and writers
+        cap.release()
+        release_all(writers)
+
+def apply_gaussian_blur_sweep_to_paths(video_path, output_paths, sigmas, num_frames=None, mode="exact"):
+    # apply_gaussian_blur_sweep with the outputs as a list (one per sigma), the form process_directory calls for a fan-out
+    apply_gaussian_blur_sweep(video_path, dict(zip(sigmas, output_paths)), num_frames=num_frames, mode=mode)
+
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None, ksize=(15, 15), mode="exact"):
+    # Apply Gaussian Blur to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_gaussian_blur, label="Gaussian Blur", workers=workers, seed=seed,
+                      ksize=ksize, mode=mode)
+
+def process_sweep_in_directory(input_dir, output_dirs, *, mode="exact", workers=1, seed=None):
+    # Apply a blur sweep to all videos, one decode per video; output_dirs maps sigma -> output directory.
+    # Runs through process_directory, so a video counts as done only once every strength was written.
+    return process_directory(input_dir, list(output_dirs.values()), apply_gaussian_blur_sweep_to_paths,
+                             label="Gaussian Blur sweep", workers=workers, seed=seed,
+                             sigmas=list(output_dirs), mode=mode)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\theft"
@@ -0,0 +1,135 @@
+import cv2
+import numpy as np
+
+def rotation_matrix(width, height, angle, scale=1.0):
+    """
+    Build the 3x3 matrix for a rotation about the frame centre.
+
+    Parameters:
+        width (int): The frame width.
+        height (int): The frame height.
+        angle (float): The rotation angle in degrees (counter-clockwise).
+        scale (float): An isotropic scale applied with the rotation. Default is 1.0.
+
+    Returns:
+        numpy.ndarray: The 3x3 transformation matrix.
+    """
+    return np.vstack([cv2.getRotationMatrix2D((width / 2, height / 2), angle, scale), [0, 0, 1]])
+
+def shear_matrix(shear_factor):
+    """
+    Build the 3x3 matrix for a horizontal shear.
+
+    Parameters:
+        shear_factor (float): The shear factor to apply.
+
+    Returns:
+        numpy.ndarray: The 3x3 transformation matrix.
+    """
+    return np.array([[1, shear_factor, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+
+def scale_matrix(scale_x, scale_y):
+    """
+    Build the 3x3 matrix for a scale about the origin.
+
+    Parameters:
+        scale_x (float): The horizontal scale factor.
+        scale_y (float): The vertical scale factor.
+
+    Returns:
+        numpy.ndarray: The 3x3 transformation matrix.
+    """
+    return np.array([[scale_x, 0, 0], [0, scale_y, 0], [0, 0, 1]], dtype=np.float64)
+
+def translation_matrix(offset_x, offset_y):
+    """
+    Build the 3x3 matrix for a translation.
+
+    Parameters:
+        offset_x (float): The horizontal offset in pixels.
+        offset_y (float): The vertical offset in pixels.
+
+    Returns:
+        numpy.ndarray: The 3x3 transformation matrix.
+    """
+    return np.array([[1, 0, offset_x], [0, 1, offset_y], [0, 0, 1]], dtype=np.float64)
+
+def flip_matrix(width):
+    """
+    Build the 3x3 matrix for a left-right flip of a frame of the given width (the same pixels as cv2.flip(frame, 1)).
+
+    Parameters:
+        width (int): The frame width.
+
+    Returns:
+        numpy.ndarray: The 3x3 transformation matrix.
+    """
+    return np.array([[-1, 0, width - 1], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+
+def compose_transforms(*matrices):
+    """
+    Multiply 2x3 or 3x3 matrices into one 3x3 matrix, so a chain of geometric ops costs a single resample.
+
+    Parameters:
+        *matrices (numpy.ndarray): The matrices in the order they are applied to the frame.
+
+    Returns:
+        numpy.ndarray: The combined 3x3 transformation matrix.
+    """
+    combined = np.eye(3)
+    for matrix in matrices:
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.shape == (2, 3):
+            matrix = np.vstack([matrix, [0, 0, 1]])
+        combined = matrix @ combined
+    return combined
+
+def warp_frame(frame, matrix, dsize=None, interpolation=cv2.INTER_LINEAR):
+    """
+    Resample a frame once with a (combined) transformation matrix.
+
+    Uses cv2.warpAffine when the matrix is affine and cv2.warpPerspective otherwise.
+
+    Parameters:
+        frame (numpy.ndarray): The input frame.
+        matrix (numpy.ndarray): The 2x3 or 3x3 transformation matrix.
+        dsize (tuple): The output size as (width, height). If None, the input size is kept. Default is None.
+        interpolation (int): The OpenCV interpolation flag. Default is cv2.INTER_LINEAR.
+
+    Returns:
+        numpy.ndarray: The warped frame.
+    """
+    if dsize is None:
+        dsize = (frame.shape[1], frame.shape[0])
+
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if matrix.shape == (2, 3) or np.allclose(matrix[2], [0, 0, 1]):
+        return cv2.warpAffine(frame, matrix[:2], dsize, flags=interpolation)
+    return cv2.warpPerspective(frame, matrix, dsize, flags=interpolation)
+
+def fold_into_remap(matrix, map_x, map_y):
+    """
+    Fold a warp applied before a cv2.remap into the remap tables, so both cost a single resample.
+
+    Remap tables give, for every output pixel, the input coordinate to sample. Sampling the warped frame
+    there is the same as sampling the original frame at the inverse warp of that coordinate.
+
+    Parameters:
+        matrix (numpy.ndarray): The 2x3 or 3x3 matrix of the warp applied first.
+        map_x (numpy.ndarray): The float32 x table of the remap applied second.
+        map_y (numpy.ndarray): The float32 y table of the remap applied second.
+
+    Returns:
+        tuple: The combined float32 map_x and map_y tables. Coordinates outside the frame stay outside.
+    """
+    inverse = np.linalg.inv(compose_transforms(matrix))
+    denominator = inverse[2, 0] * map_x + inverse[2, 1] * map_y + inverse[2, 2]
+    combined_x = (inverse[0, 0] * map_x + inverse[0, 1] * map_y + inverse[0, 2]) / denominator
+    combined_y = (inverse[1, 0] * map_x + inverse[1, 1] * map_y + inverse[1, 2]) / denominator
+
+    # Keep points the remap leaves outside the frame (e.g. -1 from apa) outside, so they stay black
+    height, width = map_x.shape
+    outside = (map_x <= -0.5) | (map_y <= -0.5) | (map_x >= width - 0.5) | (map_y >= height - 0.5)
+    combined_x[outside] = -1
+    combined_y[outside] = -1
+    return combined_x.astype(np.float32), combined_y.astype(np.float32)
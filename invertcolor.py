@@ -1,12 +1,21 @@
-import os
 import cv2
+import numpy as np
+from parallel import process_directory
+from lut import build_lut, apply_lut
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
 
 def invert_colors(frame):
     return 255 - frame
 
+def invert_colors_batch(frames):
+    # Batched counterpart of invert_colors: 255 - x is a bitwise not on uint8, done in place on the whole chunk
+    return np.bitwise_not(frames, out=frames)
+
 def apply_color_inversion(video_path, output_path, num_frames=None):
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Get video properties
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -19,44 +28,31 @@ def apply_color_inversion(video_path, output_path, num_frames=None):
         num_frames = num_frames_total
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
-
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
+    out = open_video_writer(output_path, fps, (width, height))
 
-        # Apply color inversion transformation
-        inverted_frame = invert_colors(frame)
-        
-        # Convert the inverted frame back to uint8 data type
-        inverted_frame = inverted_frame.astype('uint8')
+    # Build the inversion lookup table once for the whole clip
+    lut = build_lut([("invert",)])
 
-        # Write the transformed frame to the output video
-        out.write(inverted_frame)
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                break
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Apply color inversion transformation (uint8 in, uint8 out)
+            inverted_frame = telemetry.timed("transformed", apply_lut, frame, lut)
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, inverted_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-def process_videos_in_directory(input_dir, output_dir):
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        print(f"Processing file: {filename}")
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply color inversion to the video
-            apply_color_inversion(input_video_path, output_video_path)
-            print(f"Color inversion applied to {filename}.")
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None):
+    # Apply color inversion to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_color_inversion, label="Color inversion", workers=workers, seed=seed)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\assault"
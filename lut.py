@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+
+def _per_channel(value):
+    # Broadcast a scalar or a (b, g, r) triple to one value per channel
+    return np.broadcast_to(np.asarray(value, dtype=np.float32), (3,))
+
+def _add(table, value):
+    # Saturating add, like cv2.add
+    return np.clip(table.astype(np.int16) + np.rint(_per_channel(value)).astype(np.int16), 0, 255).astype(np.uint8)
+
+def _multiply(table, factors):
+    # Same arithmetic as apply_random_multiply: float32 product, clipped, truncated
+    return np.clip(table.astype(np.float32) * _per_channel(factors), 0, 255).astype(np.uint8)
+
+def _invert(table):
+    return 255 - table
+
+def _gamma(table, gamma):
+    return np.rint(255.0 * (table / 255.0) ** (1.0 / _per_channel(gamma))).astype(np.uint8)
+
+def _contrast(table, alpha, pivot=128):
+    return np.clip(np.rint((table.astype(np.float32) - pivot) * _per_channel(alpha) + pivot), 0, 255).astype(np.uint8)
+
+POINT_OPS = {
+    "add": _add,
+    "multiply": _multiply,
+    "invert": _invert,
+    "gamma": _gamma,
+    "contrast": _contrast,
+}
+
+def build_lut(ops):
+    """
+    Fold a chain of per-pixel intensity ops into a single per-channel 256-entry lookup table.
+
+    Each op is evaluated on the 256 possible input values in order, with the same clipping as
+    applying it to a frame, so the table reproduces the whole chain exactly.
+
+    Parameters:
+        ops (list): (name, *args) tuples applied in order, e.g. [("add", 50), ("multiply", (1.2, 0.8, 1.0)), ("invert",)].
+            Scalar arguments apply to all channels; triples are in (b, g, r) order.
+            Available ops: add (value), multiply (factors), invert, gamma (gamma), contrast (alpha, pivot=128).
+
+    Returns:
+        numpy.ndarray: A (256, 1, 3) uint8 table for cv2.LUT.
+    """
+    table = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+    for name, *args in ops:
+        table = POINT_OPS[name](table, *args)
+    return np.ascontiguousarray(table.reshape(256, 1, 3))
+
+def apply_lut(frame, lut):
+    """
+    Apply a table from build_lut to a frame with a single cv2.LUT call.
+
+    Parameters:
+        frame (numpy.ndarray): The input frame.
+        lut (numpy.ndarray): The (256, 1, 3) uint8 table.
+
+    Returns:
+        numpy.ndarray: The transformed frame.
+    """
+    return cv2.LUT(frame, lut)
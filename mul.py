@@ -1,7 +1,12 @@
-import os
 import cv2
 import numpy as np
 import random
+from parallel import process_directory
+from lut import build_lut, apply_lut
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
+from schedule import sample_schedule, precompute, ScheduledTransform
 
 def apply_random_multiply(frame):
     # Define random factors for multiplication
@@ -9,20 +14,44 @@ def apply_random_multiply(frame):
     factor_g = random.uniform(0.5, 2.0)
     factor_b = random.uniform(0.5, 2.0)
     
-    # Multiply the frame by the random factors
-    multiplied_frame = frame.astype(np.float32)
-    multiplied_frame[:,:,0] *= factor_b
-    multiplied_frame[:,:,1] *= factor_g
-    multiplied_frame[:,:,2] *= factor_r
-    
-    # Clip pixel values to the valid range [0, 255]
-    multiplied_frame = np.clip(multiplied_frame, 0, 255).astype(np.uint8)
+    # Fold the multiply and the clip to [0, 255] into a 256-entry table per channel,
+    # so the frame itself never goes through a float32 copy
+    lut = build_lut([("multiply", (factor_b, factor_g, factor_r))])
+    multiplied_frame = apply_lut(frame, lut)
     
     return multiplied_frame
 
-def apply_random_multiply_to_video(video_path, output_path, num_frames=None):
+def apply_random_multiply_batch(frames):
+    """
+    Batched counterpart of apply_random_multiply for a (T, H, W, 3) uint8 chunk, modified in place.
+
+    Each frame still gets its own random factors (drawn in the same order as the per-frame function).
+    All T lookup tables are built in one vectorised step and applied in place, so the chunk needs
+    no temporary arrays.
+    """
+    num_frames = len(frames)
+
+    # Draw r, g, b factors per frame like apply_random_multiply, then reorder to the b, g, r channel order
+    factors = np.array([[random.uniform(0.5, 2.0) for _ in range(3)] for _ in range(num_frames)], dtype=np.float32)[:, ::-1]
+
+    # One 256-entry table per frame and channel, shaped (T, 256, 1, 3) for cv2.LUT
+    ramp = np.arange(256, dtype=np.float32).reshape(256, 1, 1)
+    luts = np.clip(ramp * factors[:, None, None, :], 0, 255).astype(np.uint8)
+
+    for i in range(num_frames):
+        cv2.LUT(frames[i], luts[i], dst=frames[i])
+
+    return frames
+
+def multiply_schedule(num_frames, schedule="per_frame", low=0.5, high=2.0, step=None):
+    # Sample the clip's r, g, b factors up front (in apply_random_multiply's draw order), then build each
+    # distinct lookup table once, in b, g, r order
+    factors = sample_schedule(num_frames, low, high, schedule, size=3, step=step)[:, ::-1]
+    return precompute(factors, lambda row: build_lut([("multiply", tuple(row))]))
+
+def apply_random_multiply_to_video(video_path, output_path, num_frames=None, schedule="per_frame", step=None):
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Check if the video file was successfully opened
     if not cap.isOpened():
@@ -40,57 +69,49 @@ def apply_random_multiply_to_video(video_path, output_path, num_frames=None):
         num_frames = num_frames_total
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    out = open_video_writer(output_path, fps, (width, height))
 
     # Check if the output video file was successfully created
     if not out.isOpened():
         print(f"Error: Could not create output video file '{output_path}'")
         return
 
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
-            break
-
-        # Apply random multiply transformation
-        multiplied_frame = apply_random_multiply(frame)
+    # "per_frame" matches apply_random_multiply; "constant" and "smooth" avoid colour flicker
+    multiply = ScheduledTransform(multiply_schedule(max(num_frames, 1), schedule, step=step), apply_lut)
 
-        # Check if multiplied frame has data
-        if multiplied_frame is None:
-            print(f"Warning: Skipping empty frame {i + 1} in video '{video_path}'.")
-            continue
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
+                break
 
-        # Write the transformed frame to the output video
-        out.write(multiplied_frame)
+            # Apply random multiply transformation
+            multiplied_frame = telemetry.timed("transformed", multiply, frame)
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Check if multiplied frame has data
+            if multiplied_frame is None:
+                print(f"Warning: Skipping empty frame {i + 1} in video '{video_path}'.")
+                continue
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, multiplied_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-def process_videos_in_directory(input_dir, output_dir):
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply random multiply to the video
-            apply_random_multiply_to_video(input_video_path, output_video_path)
-            print(f"Random multiply applied to {filename}.")
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None, schedule="per_frame", step=None):
+    # Apply random multiply to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_random_multiply_to_video, label="Random multiply", workers=workers, seed=seed,
+                      schedule=schedule, step=step)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\assault"
     output_dir = "C:\\Users\\Wilbert\\Desktop\\data\\augmented\\assaultmultiply"
 
-    # Process all videos in the input directory
-    process_videos_in_directory(input_dir, output_dir)
+    # Process all videos in the input directory with one set of factors per clip
+    process_videos_in_directory(input_dir, output_dir, schedule="constant")
 
     print("All videos processed successfully.")
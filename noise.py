@@ -0,0 +1,102 @@
+import numpy as np
+
+def noise_rng(seed=None):
+    """
+    Create the numpy Generator used for noise.
+
+    Without a seed it is seeded from the legacy np.random state, so runs seeded through
+    np.random.seed (e.g. parallel.process_directory) stay reproducible.
+
+    Parameters:
+        seed (int): The seed. If None, one is drawn from np.random. Default is None.
+
+    Returns:
+        numpy.random.Generator: The random generator.
+    """
+    if seed is None:
+        seed = np.random.randint(0, 2 ** 31 - 1)
+    return np.random.default_rng(seed)
+
+def _sample_hits(rng, num_pixels, probability):
+    # Every pixel must end up hit independently with `probability`. Drawing a Poisson number of
+    # positions with replacement at rate -ln(1 - p) gives exactly that (a pixel is missed with
+    # probability e^-rate = 1 - p), and costs O(hits) instead of a float per pixel.
+    if probability <= 0:
+        return np.empty(0, dtype=np.int64)
+    if probability >= 1:
+        return np.arange(num_pixels)
+    num_hits = rng.poisson(-num_pixels * np.log1p(-probability))
+    return rng.integers(0, num_pixels, size=num_hits)
+
+def sample_salt_and_pepper(shape, saltiness=0.0, pepperness=0.0, rng=None):
+    """
+    Draw salt and pepper positions for a frame or a batch of frames in one draw.
+
+    The number of noisy pixels scales with the noise probability, not the frame area; each
+    drawn position is then split between salt and pepper.
+
+    Parameters:
+        shape (tuple): The pixel grid, (height, width) for a frame or (frames, height, width) for a batch.
+        saltiness (float): The probability of a white pixel. Default is 0.0.
+        pepperness (float): The probability of a black pixel. Default is 0.0.
+        rng (numpy.random.Generator): The random generator. If None, noise_rng() is used. Default is None.
+
+    Returns:
+        tuple: Flat indices into the pixel grid for salt and for pepper.
+    """
+    if rng is None:
+        rng = noise_rng()
+
+    num_pixels = int(np.prod(shape))
+    probability = saltiness + pepperness
+    hits = _sample_hits(rng, num_pixels, min(probability, 1.0))
+    if probability <= 0:
+        return hits, hits
+
+    # Positions are drawn independently, so the first num_salt of them are as random as any other split
+    num_salt = rng.binomial(len(hits), saltiness / probability)
+    return hits[:num_salt], hits[num_salt:]
+
+def _apply_indices(frames, pixel_ndim, salt_indices, pepper_indices):
+    pixel_shape = frames.shape[:pixel_ndim]
+    if frames.flags.c_contiguous:
+        # View the frames as one row per pixel, so flat indices can be written directly
+        pixels = frames.reshape(int(np.prod(pixel_shape)), -1)
+        pixels[salt_indices] = 255
+        pixels[pepper_indices] = 0
+    else:
+        frames[np.unravel_index(salt_indices, pixel_shape)] = 255
+        frames[np.unravel_index(pepper_indices, pixel_shape)] = 0
+    return frames
+
+def apply_salt_and_pepper(frame, saltiness=0.0, pepperness=0.0, rng=None):
+    """
+    Add salt (white) and pepper (black) pixels to a frame in place.
+
+    Parameters:
+        frame (numpy.ndarray): The input frame, (height, width) or (height, width, channels).
+        saltiness (float): The probability of a white pixel. Default is 0.0.
+        pepperness (float): The probability of a black pixel. Default is 0.0.
+        rng (numpy.random.Generator): The random generator. If None, noise_rng() is used. Default is None.
+
+    Returns:
+        numpy.ndarray: The frame with noise applied.
+    """
+    salt_indices, pepper_indices = sample_salt_and_pepper(frame.shape[:2], saltiness, pepperness, rng)
+    return _apply_indices(frame, 2, salt_indices, pepper_indices)
+
+def apply_salt_and_pepper_batch(frames, saltiness=0.0, pepperness=0.0, rng=None):
+    """
+    Add salt and pepper pixels to a whole batch of frames in place, with masks for every frame drawn at once.
+
+    Parameters:
+        frames (numpy.ndarray): The input frames, (frames, height, width) or (frames, height, width, channels).
+        saltiness (float): The probability of a white pixel. Default is 0.0.
+        pepperness (float): The probability of a black pixel. Default is 0.0.
+        rng (numpy.random.Generator): The random generator. If None, noise_rng() is used. Default is None.
+
+    Returns:
+        numpy.ndarray: The frames with noise applied.
+    """
+    salt_indices, pepper_indices = sample_salt_and_pepper(frames.shape[:3], saltiness, pepperness, rng)
+    return _apply_indices(frames, 3, salt_indices, pepper_indices)
@@ -0,0 +1,195 @@
+import multiprocessing
+import os
+import random
+import time
+import zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from telemetry import telemetry
+from catalog import Catalog
+from cache import (cache_key, load_manifest, save_manifest, is_up_to_date, record_output,
+                   temp_output_path, commit_output, remove_partial_outputs)
+
+# Seconds between manifest writes; finished files in between are saved together
+MANIFEST_SAVE_INTERVAL = 5.0
+
+def file_seed(seed, filename):
+    """
+    Derive the seed for one file from the run seed and the file name, so a file gets the same
+    random stream no matter which worker processes it or in which order.
+    """
+    return (seed + zlib.crc32(filename.encode("utf-8"))) % (2 ** 32)
+
+def _process_file(apply_function, input_video_path, output_video_path, seed, kwargs, in_worker=False):
+    # Seed both random generators the per-frame functions use
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    # Write to a temp name and rename when done, so a killed run never leaves a file that looks finished.
+    # Fan-out functions get a list of output paths and write each to its own temp name.
+    fan_out = isinstance(output_video_path, list)
+    output_paths = output_video_path if fan_out else [output_video_path]
+    temp_paths = [temp_output_path(path) for path in output_paths]
+    try:
+        with telemetry.track_file(input_video_path):
+            apply_function(input_video_path, temp_paths if fan_out else temp_paths[0], **kwargs)
+    except Exception:
+        # A failed encode leaves a truncated temp file; drop it rather than leave it for the next run
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        raise
+    missing = [path for temp_path, path in zip(temp_paths, output_paths) if not commit_output(temp_path, path)]
+    if missing:
+        raise RuntimeError(f"no output was written for '{input_video_path}' to {', '.join(missing)}")
+
+    # Worker processes hand their counters back to the parent's telemetry
+    if in_worker:
+        return telemetry.export_totals()
+
+def process_directory(input_dir, output_dir, apply_function, *, label="Transform", extensions=(".mp4", ".mov"),
+                      workers=1, seed=None, resume=True, hash_inputs=False, catalog=None, class_name=None, **kwargs):
+    """
+    Apply a per-video function to all videos in the input directory, optionally across a process pool.
+
+    Files are started largest first so a single long clip does not finish last on its own. Each file
+    is seeded from (seed, filename), so the parallel output matches the serial output when seeded.
+
+    Finished outputs are recorded in a manifest in the output directory, keyed by the input
+    fingerprint, transform, parameters and seed; a re-run skips outputs whose key still matches.
+
+    Parameters:
+        input_dir (str): The path to the input directory containing video files.
+        output_dir (str or list): The path to the output directory to save processed videos, or a list of
+            directories for a fan-out function that writes one output per directory from a single decode.
+        apply_function (callable): The per-video function, called as apply_function(input_path, output_path, **kwargs)
+            (with a list of output paths, one per directory, when output_dir is a list).
+            Must be a module-level function so it can be sent to worker processes.
+        label (str): The name of the effect used in progress messages. Default is "Transform".
+        extensions (tuple): The file extensions to process. Default is (".mp4", ".mov").
+        workers (int): The number of worker processes. 1 processes files one at a time in this process. Default is 1.
+        seed (int): The base random seed. If None, the random generators are left untouched. Default is None.
+        resume (bool): Skip outputs that the manifest records as finished with the same key. Default is True.
+        hash_inputs (bool): Fingerprint inputs by content hash instead of size and mtime. Default is False.
+        catalog (str): The path to a catalog database (see catalog.py). If given, the input files and their sizes
+            come from the catalog (after an incremental scan), and every output is recorded in it with its
+            lineage. Default is None.
+        class_name (str): The class recorded in the catalog for input videos it does not know yet. If None,
+            the name of the input directory (the data/cleaned/<class> layout). Default is None.
+        **kwargs: Extra keyword arguments passed to apply_function.
+
+    Returns:
+        list: The file names that failed.
+    """
+    # Create output directories if they don't exist
+    fan_out = isinstance(output_dir, (list, tuple))
+    output_dirs = list(output_dir) if fan_out else [output_dir]
+    for directory in output_dirs:
+        os.makedirs(directory, exist_ok=True)
+
+    # Collect the files to process, largest first
+    catalog_db = Catalog(catalog) if catalog else None
+    if catalog_db is not None:
+        if class_name is None:
+            class_name = os.path.basename(os.path.normpath(input_dir))
+        catalog_db.scan(input_dir, class_name=class_name, extensions=extensions)
+        rows = [row for row in catalog_db.videos(directory=input_dir) if row["path"].endswith(extensions)]
+        rows.sort(key=lambda row: row["size"], reverse=True)
+        filenames = [os.path.basename(row["path"]) for row in rows]
+    else:
+        filenames = [filename for filename in os.listdir(input_dir) if filename.endswith(extensions)]
+        filenames.sort(key=lambda filename: os.path.getsize(os.path.join(input_dir, filename)), reverse=True)
+
+    # Drop temp files an interrupted run left for these files and load what earlier runs finished
+    for directory in output_dirs:
+        remove_partial_outputs(directory, filenames)
+    manifests = [load_manifest(directory) if resume else {} for directory in output_dirs]
+    transform_name = getattr(apply_function, "__qualname__", label)
+
+    jobs = []
+    for filename in filenames:
+        input_video_path = os.path.join(input_dir, filename)
+        output_paths = [os.path.join(directory, filename) for directory in output_dirs]
+        file_seed_value = None if seed is None else file_seed(seed, filename)
+        key = cache_key(input_video_path, transform_name, kwargs, file_seed_value, hash_inputs)
+        if resume and all(is_up_to_date(manifest, filename, key, path) for manifest, path in zip(manifests, output_paths)):
+            print(f"Skipping {filename}: {label} output is up to date.")
+            continue
+        jobs.append((filename, input_video_path, output_paths if fan_out else output_paths[0], file_seed_value, key))
+
+    # Rewriting the whole manifest after every file is quadratic in the folder size, so saves are batched
+    last_save = [time.monotonic()]
+    unsaved = [0]
+
+    def save_manifests():
+        if unsaved[0]:
+            for directory, manifest in zip(output_dirs, manifests):
+                save_manifest(directory, manifest)
+            unsaved[0] = 0
+        last_save[0] = time.monotonic()
+
+    def finished(filename, output_video_path, key):
+        output_paths = output_video_path if fan_out else [output_video_path]
+        for manifest, path in zip(manifests, output_paths):
+            record_output(manifest, filename, key, path)
+            if catalog_db is not None:
+                catalog_db.record_output(path, os.path.join(input_dir, filename), label, kwargs)
+        unsaved[0] += 1
+        if time.monotonic() - last_save[0] >= MANIFEST_SAVE_INTERVAL:
+            save_manifests()
+
+    # Report throughput periodically unless a caller already started the reporter
+    started_reporter = telemetry.start_reporter()
+
+    failed = []
+    try:
+        _run_jobs(apply_function, jobs, label, workers, kwargs, finished, failed)
+    finally:
+        # Files finished since the last save are only redone if the run dies before this point
+        save_manifests()
+        if started_reporter:
+            telemetry.stop_reporter()
+        if catalog_db is not None:
+            catalog_db.close()
+
+    return failed
+
+def _init_worker(updates):
+    # A module-level function, so the pool can pickle it under the spawn start method (the default on Windows);
+    # the shared Telemetry object itself holds a lock and cannot be pickled
+    telemetry.start_pushing(updates)
+
+def _run_jobs(apply_function, jobs, label, workers, kwargs, finished, failed):
+    if workers is None or workers > 1:
+        # Workers send their counters every second while they run, so the live report covers files in progress
+        updates = multiprocessing.Queue()
+        merger = telemetry.start_merging(updates)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(updates,)) as executor:
+                futures = {executor.submit(_process_file, apply_function, input_video_path, output_video_path,
+                                           file_seed_value, kwargs, True): (filename, output_video_path, key)
+                           for filename, input_video_path, output_video_path, file_seed_value, key in jobs}
+                for future in as_completed(futures):
+                    filename, output_video_path, key = futures[future]
+                    try:
+                        # The rest of the file's counters (since the last push) come back with the result
+                        telemetry.merge(future.result())
+                        finished(filename, output_video_path, key)
+                        print(f"{label} applied to {filename}.")
+                    except Exception as e:
+                        print(f"Error: {label} failed for {filename}: {e}")
+                        failed.append(filename)
+        finally:
+            # The workers have exited, so everything they pushed is already queued ahead of the None
+            updates.put(None)
+            merger.join()
+    else:
+        for filename, input_video_path, output_video_path, file_seed_value, key in jobs:
+            try:
+                _process_file(apply_function, input_video_path, output_video_path, file_seed_value, kwargs)
+                finished(filename, output_video_path, key)
+                print(f"{label} applied to {filename}.")
+            except Exception as e:
+                print(f"Error: {label} failed for {filename}: {e}")
+                failed.append(filename)
@@ -0,0 +1,223 @@
+import queue
+import threading
+import time
+import cv2
+from parallel import process_directory
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
+from sampling import open_selected_video
+
+# Marks the end of the frame stream on a queue
+_END = object()
+
+def _put(q, item, stop_event):
+    # Block until there is room on the queue (backpressure), but give up once another stage failed
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop_event):
+    while not stop_event.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+def _acquire(semaphore, stop_event):
+    # Like _put: wait for a free slot, but give up once another stage failed
+    while not stop_event.is_set():
+        if semaphore.acquire(timeout=0.1):
+            return True
+    return False
+
+def run_frame_pipeline(read_frame, frame_function, write_frame, num_frames, queue_size=8, num_workers=1):
+    """
+    Run decode, transform and encode on separate threads joined by bounded queues.
+
+    OpenCV releases the GIL inside read/write and most image operations, so the three stages overlap
+    instead of waiting on each other. Frames are written in decode order even with several transform workers.
+    The number of frames between decode and write is capped (what the two queues and the workers can hold),
+    so a slow frame holding up the write order stalls decoding instead of letting reordered frames pile up.
+
+    Parameters:
+        read_frame (callable): Returns (ret, frame), e.g. cv2.VideoCapture.read.
+        frame_function (callable): The per-frame transform (frame -> frame).
+        write_frame (callable): Consumes a transformed frame, e.g. cv2.VideoWriter.write.
+        num_frames (int): The maximum number of frames to read.
+        queue_size (int): The capacity of each queue between stages. Default is 8.
+        num_workers (int): The number of transform threads. Default is 1.
+
+    Returns:
+        int: The number of frames written.
+    """
+    decoded = queue.Queue(maxsize=queue_size)
+    transformed = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    errors = []
+    written = [0]
+    # Held from decode until the frame is written (or dropped)
+    in_flight = threading.BoundedSemaphore(2 * queue_size + num_workers)
+
+    def decode():
+        try:
+            for i in range(num_frames):
+                if not _acquire(in_flight, stop_event):
+                    return
+                start = time.perf_counter()
+                ret, frame = read_frame()
+                if not ret:
+                    in_flight.release()
+                    break
+                telemetry.add("decoded", 1, time.perf_counter() - start)
+                if not _put(decoded, (i, frame), stop_event):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            # One end marker per transform worker
+            for _ in range(num_workers):
+                _put(decoded, _END, stop_event)
+
+    def transform():
+        try:
+            while True:
+                item = _get(decoded, stop_event)
+                if item is _END:
+                    break
+                i, frame = item
+                if not _put(transformed, (i, telemetry.timed("transformed", frame_function, frame)), stop_event):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _put(transformed, _END, stop_event)
+
+    def encode():
+        # Transformed frames can arrive out of order with several workers, so hold them until their turn
+        pending = {}
+        next_index = 0
+        finished_workers = 0
+        try:
+            while finished_workers < num_workers:
+                item = _get(transformed, stop_event)
+                if item is _END:
+                    if stop_event.is_set():
+                        return
+                    finished_workers += 1
+                    continue
+                i, frame = item
+                pending[i] = frame
+                while next_index in pending:
+                    frame = pending.pop(next_index)
+                    if frame is not None:
+                        telemetry.timed("encoded", write_frame, frame)
+                        written[0] += 1
+                    next_index += 1
+                    in_flight.release()
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+
+    threads = [threading.Thread(target=decode, name="decode")]
+    threads += [threading.Thread(target=transform, name=f"transform-{n}") for n in range(num_workers)]
+    threads.append(threading.Thread(target=encode, name="encode"))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return written[0]
+
+def apply_frame_function_to_video(video_path, output_path, frame_function, num_frames=None, queue_size=8, num_workers=1,
+                                  selection=None):
+    """
+    Apply a per-frame function (e.g. apply_add_effect, apply_random_rotation) to a video using the threaded
+    decode -> transform -> encode pipeline and save the result to a new video.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+        output_path (str): The path to save the output video file.
+        frame_function (callable): The per-frame transform (frame -> frame).
+        num_frames (int): The number of frames to process. If None, process all frames. Default is None.
+        queue_size (int): The capacity of each queue between stages. Default is 8.
+        num_workers (int): The number of transform threads. Default is 1.
+        selection (dict): Frame selection (stride, start_time, end_time, num_clips, clip_len), see
+            sampling.select_frames. Unselected frames are skipped without being converted. Default is None.
+    """
+    # Open video file, reading only the selected frames if a selection is given
+    cap = open_selected_video(video_path, **selection) if selection else open_video(video_path)
+
+    # Check if the video file was successfully opened
+    if not cap.isOpened():
+        print(f"Error: Could not open video file '{video_path}'")
+        return
+
+    # Get video properties
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # Determine the number of frames to process
+    if num_frames is None:
+        num_frames = num_frames_total
+
+    # Create output video
+    out = open_video_writer(output_path, fps, (width, height))
+
+    # Check if the output video file was successfully created
+    if not out.isOpened():
+        print(f"Error: Could not create output video file '{output_path}'")
+        cap.release()
+        return
+
+    try:
+        frames_written = run_frame_pipeline(cap.read, frame_function, out.write, num_frames,
+                                            queue_size=queue_size, num_workers=num_workers)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
+
+    print(f"Processed {frames_written}/{num_frames_total} frames for video {video_path}")
+
+def process_videos_in_directory(input_dir, output_dir, frame_function, *, queue_size=8, num_workers=1, workers=1, seed=None,
+                                selection=None):
+    """
+    Apply a per-frame function to all videos in the input directory using the threaded pipeline.
+
+    Parameters:
+        input_dir (str): The path to the input directory containing video files.
+        output_dir (str): The path to the output directory to save processed videos.
+        frame_function (callable): The per-frame transform (frame -> frame).
+        queue_size (int): The capacity of each queue between stages. Default is 8.
+        num_workers (int): The number of transform threads per video. Default is 1.
+        workers (int): The number of worker processes. Default is 1 (one file at a time).
+        seed (int): The base random seed; seeded runs give the same output for any worker count. Default is None.
+        selection (dict): Frame selection applied to every video, see sampling.select_frames. Default is None.
+    """
+    process_directory(input_dir, output_dir, apply_frame_function_to_video,
+                      label=getattr(frame_function, "__name__", "Transform"), workers=workers, seed=seed,
+                      frame_function=frame_function, queue_size=queue_size, num_workers=num_workers,
+                      selection=selection)
+
+if __name__ == "__main__":
+    from ranrot import apply_random_rotation
+
+    input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\theft"
+    output_dir = "C:\\Users\\Wilbert\\Desktop\\data\\augmented\\theftrot"
+
+    # Process all videos in the input directory
+    process_videos_in_directory(input_dir, output_dir, apply_random_rotation)
+
+    print("All videos processed successfully.")
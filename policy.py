@@ -0,0 +1,199 @@
+import os
+import random
+import cv2
+
+from apa import get_piecewise_affine_maps, random_mesh_points
+from blur import gaussian_blur
+from geometry import compose_transforms, flip_matrix, fold_into_remap, rotation_matrix, shear_matrix, warp_frame
+from lut import build_lut
+from noise import apply_salt_and_pepper, noise_rng
+from parallel import process_directory
+from pipeline import apply_frame_function_to_video
+from randresize import random_crop_box, resized_crop_matrix
+from superpix import IncrementalSuperpixels
+
+# Every op maps a magnitude in [0, 1] to parameters drawn once per clip, so a clip is augmented consistently
+# over time. Ops are grouped by how they are applied: "point" ops fold into one lookup table, "geometric"
+# ops into one warp (or one remap with the piecewise affine mesh), and "filter" and "noise" ops run after.
+OPS = {
+    "add": "point",
+    "multiply": "point",
+    "invert": "point",
+    "rotation": "geometric",
+    "shear": "geometric",
+    "resize": "geometric",
+    "flip": "geometric",
+    "piecewise_affine": "geometric",
+    "blur": "filter",
+    "superpixel": "filter",
+    "salt": "noise",
+    "pepper": "noise",
+}
+
+def rand_augment(num_ops=2, magnitude=0.5, ops=None):
+    """
+    Sample a RandAugment-style plan: `num_ops` distinct ops, all at the same magnitude.
+
+    Parameters:
+        num_ops (int): The number of ops per clip. Default is 2.
+        magnitude (float): The shared magnitude in [0, 1]. Default is 0.5.
+        ops (list): The op names to choose from. If None, all of OPS. Default is None.
+
+    Returns:
+        list: (op name, magnitude) pairs in the order they were drawn.
+    """
+    ops = list(OPS) if ops is None else list(ops)
+    return [(name, magnitude) for name in random.sample(ops, min(num_ops, len(ops)))]
+
+def trivial_augment(ops=None):
+    """
+    Sample a TrivialAugment-style plan: one op at a uniformly random magnitude.
+
+    Returns:
+        list: A single (op name, magnitude) pair.
+    """
+    ops = list(OPS) if ops is None else list(ops)
+    return [(random.choice(ops), random.uniform(0.0, 1.0))]
+
+def _signed(magnitude):
+    # A random-signed magnitude, so ops like rotation go both ways
+    return magnitude * random.choice((-1.0, 1.0))
+
+class PolicyTransform:
+    """
+    A per-frame function that applies a sampled plan of ops in one pass.
+
+    The op parameters are drawn when the first frame arrives (the geometric ones need its size) and are
+    then fixed for the clip. Point ops are applied with one cv2.LUT, geometric ops with one warp (folded
+    into the piecewise affine remap when that op is in the plan), then filters, then noise. Within each
+    group the plan's order is kept; across groups this fixed order stands in for the plan's order.
+
+    Parameters:
+        plan (list): (op name, magnitude) pairs, e.g. from rand_augment or trivial_augment.
+    """
+
+    def __init__(self, plan):
+        self.plan = list(plan)
+        self._frame_size = None
+
+    def _compile(self, width, height):
+        point_ops = []
+        matrices = []
+        mesh = None
+        self._filters = []
+        self._saltiness = self._pepperness = 0.0
+
+        for name, magnitude in self.plan:
+            if name == "add":
+                # All three channels, unlike add.py's blue-only add
+                point_ops.append(("add", _signed(magnitude) * 100.0))
+            elif name == "multiply":
+                point_ops.append(("multiply", tuple(2.0 ** random.uniform(-magnitude, magnitude) for _ in range(3))))
+            elif name == "invert":
+                point_ops.append(("invert",))
+            elif name == "rotation":
+                matrices.append(rotation_matrix(width, height, _signed(magnitude) * 30.0))
+            elif name == "shear":
+                matrices.append(shear_matrix(_signed(magnitude) * 0.3))
+            elif name == "resize":
+                box = random_crop_box(width, height, scale=(1.0 - 0.75 * magnitude, 1.0))
+                matrices.append(resized_crop_matrix(box, (width, height)))
+            elif name == "flip":
+                matrices.append(flip_matrix(width))
+            elif name == "piecewise_affine":
+                mesh = random_mesh_points(width, height, jitter=0.02 + 0.1 * magnitude, variant=random.randrange(8))
+            elif name == "blur":
+                self._filters.append(("blur", 0.5 + 4.0 * magnitude))
+            elif name == "superpixel":
+                self._filters.append(("superpixel", IncrementalSuperpixels(downscale=0.5)))
+            elif name == "salt":
+                self._saltiness = 0.05 * magnitude
+            elif name == "pepper":
+                self._pepperness = 0.05 * magnitude
+            else:
+                raise ValueError(f"Unknown augmentation op '{name}'")
+
+        self._lut = build_lut(point_ops) if point_ops else None
+        self._matrix = compose_transforms(*matrices) if matrices else None
+        self._maps = None
+        if mesh is not None:
+            map_x, map_y = get_piecewise_affine_maps(width, height, *mesh)
+            self._maps = fold_into_remap(self._matrix, map_x, map_y) if matrices else (map_x, map_y)
+        self._rng = noise_rng() if self._saltiness or self._pepperness else None
+        self._frame_size = (width, height)
+
+    def __call__(self, frame):
+        decoded = frame
+        height, width = frame.shape[:2]
+        if self._frame_size != (width, height):
+            self._compile(width, height)
+
+        if self._lut is not None:
+            frame = cv2.LUT(frame, self._lut)
+        if self._maps is not None:
+            frame = cv2.remap(frame, self._maps[0], self._maps[1], cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        elif self._matrix is not None:
+            frame = warp_frame(frame, self._matrix)
+        for name, setting in self._filters:
+            frame = gaussian_blur(frame, setting, mode="fast") if name == "blur" else setting(frame)
+        if self._rng is not None:
+            # The noise is applied in place, so make sure the decoded frame is not modified
+            if frame is decoded:
+                frame = frame.copy()
+            frame = apply_salt_and_pepper(frame, self._saltiness, self._pepperness, rng=self._rng)
+        return frame
+
+def sample_plan(policy="randaugment", num_ops=2, magnitude=0.5, ops=None):
+    """Sample one plan with the named policy ("randaugment" or "trivialaugment")."""
+    if policy == "randaugment":
+        return rand_augment(num_ops, magnitude, ops)
+    if policy == "trivialaugment":
+        return trivial_augment(ops)
+    raise ValueError(f"Unknown augmentation policy '{policy}'")
+
+def apply_policy_to_video(video_path, output_path, policy="randaugment", num_ops=2, magnitude=0.5, ops=None,
+                          num_frames=None):
+    """
+    Sample a plan of ops for a clip and apply all of them in a single decode/encode pass.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+        output_path (str): The path to save the output video file.
+        policy (str): "randaugment" or "trivialaugment". Default is "randaugment".
+        num_ops (int): The number of ops per clip for RandAugment. Default is 2.
+        magnitude (float): The magnitude in [0, 1] for RandAugment. Default is 0.5.
+        ops (list): The op names to choose from. If None, all of OPS. Default is None.
+        num_frames (int): The number of frames to process. If None, process all frames. Default is None.
+    """
+    plan = sample_plan(policy, num_ops, magnitude, ops)
+    print(f"Augmenting {os.path.basename(video_path)} with " + ", ".join(f"{name} ({m:.2f})" for name, m in plan))
+    apply_frame_function_to_video(video_path, output_path, PolicyTransform(plan), num_frames=num_frames)
+
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None, policy="randaugment", num_ops=2,
+                                magnitude=0.5, ops=None):
+    """
+    Apply a sampled augmentation plan to every video in the input directory, one pass per video.
+
+    Parameters:
+        input_dir (str): The path to the input directory containing video files.
+        output_dir (str): The path to the output directory to save processed videos.
+        workers (int): The number of worker processes. Default is 1 (one file at a time).
+        seed (int): The base random seed; seeded runs sample the same plans for any worker count. Default is None.
+        policy (str): "randaugment" or "trivialaugment". Default is "randaugment".
+        num_ops (int): The number of ops per clip for RandAugment. Default is 2.
+        magnitude (float): The magnitude in [0, 1] for RandAugment. Default is 0.5.
+        ops (list): The op names to choose from. If None, all of OPS. Default is None.
+    """
+    process_directory(input_dir, output_dir, apply_policy_to_video, label=f"{policy} policy", workers=workers,
+                      seed=seed, policy=policy, num_ops=num_ops, magnitude=magnitude, ops=ops)
+
+if __name__ == "__main__":
+    input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\assault"
+
+    # A few differently seeded RandAugment variants of the class, one decode/encode each
+    for variant in range(3):
+        output_dir = f"C:\\Users\\Wilbert\\Desktop\\data\\augmented\\assaultrandaug{variant}"
+        process_videos_in_directory(input_dir, output_dir, num_ops=2, magnitude=0.5, seed=variant)
+
+    print("All videos processed successfully.")
@@ -1,7 +1,11 @@
-import os
 import cv2
 import numpy as np
 import random
+from parallel import process_directory
+from geometry import scale_matrix, translation_matrix, compose_transforms
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
 
 def apply_random_resize(frame):
     # Define random scale factors for resizing
@@ -13,9 +17,60 @@ def apply_random_resize(frame):
     
     return resized_frame
 
-def apply_random_resize_to_video(video_path, output_path, num_frames=None):
+def random_resize_matrix():
+    """
+    Draw the same random scale factors as apply_random_resize, as a 3x3 matrix.
+
+    Combine it with other geometric ops through geometry.compose_transforms and resample once
+    with geometry.warp_frame at a fixed output size.
+    """
+    scale_x = random.uniform(0.5, 2.0)
+    scale_y = random.uniform(0.5, 2.0)
+    return scale_matrix(scale_x, scale_y)
+
+def random_crop_box(width, height, scale=(0.25, 1.0), ratio=(3 / 4, 4 / 3)):
+    # Draw a crop covering `scale` of the frame area with an aspect ratio in `ratio` (log-uniform),
+    # returned as (x, y, w, h). Falls back to the largest centred crop within `ratio`.
+    area = width * height
+    log_ratio = (np.log(ratio[0]), np.log(ratio[1]))
+    for _ in range(10):
+        target_area = area * random.uniform(*scale)
+        aspect_ratio = np.exp(random.uniform(*log_ratio))
+        crop_width = int(round(np.sqrt(target_area * aspect_ratio)))
+        crop_height = int(round(np.sqrt(target_area / aspect_ratio)))
+        if 0 < crop_width <= width and 0 < crop_height <= height:
+            x = random.randint(0, width - crop_width)
+            y = random.randint(0, height - crop_height)
+            return x, y, crop_width, crop_height
+
+    frame_ratio = width / height
+    if frame_ratio < ratio[0]:
+        crop_width, crop_height = width, int(round(width / ratio[0]))
+    elif frame_ratio > ratio[1]:
+        crop_width, crop_height = int(round(height * ratio[1])), height
+    else:
+        crop_width, crop_height = width, height
+    return (width - crop_width) // 2, (height - crop_height) // 2, crop_width, crop_height
+
+def resized_crop_matrix(box, output_size):
+    # The same crop-and-resize as a 3x3 matrix, to combine with other geometric ops in one warp
+    x, y, crop_width, crop_height = box
+    return compose_transforms(translation_matrix(-x, -y), scale_matrix(output_size[0] / crop_width, output_size[1] / crop_height))
+
+def apply_resized_crop(frame, box, output_size):
+    # Resample only the crop (a view, no copy) straight to the output size
+    x, y, crop_width, crop_height = box
+    crop = frame[y:y + crop_height, x:x + crop_width]
+    shrinking = output_size[0] * output_size[1] < crop_width * crop_height
+    return cv2.resize(crop, output_size, interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+
+def apply_random_resize_to_video(video_path, output_path, num_frames=None, output_size=None, scale=(0.25, 1.0), ratio=(3 / 4, 4 / 3)):
+    # Random resized crop: one crop box per clip, resampled straight to a constant output size
+    # (the input size unless given), so the cost is bounded by the output size and every frame
+    # matches the writer.
+
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Check if the video file was successfully opened
     if not cap.isOpened():
@@ -32,56 +87,42 @@ def apply_random_resize_to_video(video_path, output_path, num_frames=None):
     if num_frames is None:
         num_frames = num_frames_total
 
-    # Create output video
+    # Choose the output size and the crop box for the whole clip
+    if output_size is None:
+        output_size = (width, height)
+    output_size = tuple(output_size)
+    box = random_crop_box(width, height, scale, ratio)
 
-    
-# Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'XVID'), fps, (width, height))
+    # Create output video
+    out = open_video_writer(output_path, fps, output_size)
 
-    
     # Check if the output video file was successfully created
     if not out.isOpened():
         print(f"Error: Could not create output video file '{output_path}'")
         return
 
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
-            break
-
-        # Apply random resize transformation
-        resized_frame = apply_random_resize(frame)
-
-        # Check if resized frame has data
-        if resized_frame is None:
-            print(f"Warning: Skipping empty frame {i + 1} in video '{video_path}'.")
-            continue
-
-        # Write the transformed frame to the output video
-        out.write(resized_frame)
-
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
-
-    # Release video capture and writer
-    cap.release()
-    out.release()
-
-def process_videos_in_directory(input_dir, output_dir):
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply random resize to the video
-            apply_random_resize_to_video(input_video_path, output_video_path)
-            print(f"Random resize applied to {filename}.")
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
+                break
+
+            # Apply the resized crop
+            resized_frame = telemetry.timed("transformed", apply_resized_crop, frame, box, output_size)
+
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, resized_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
+
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None, output_size=None):
+    # Apply random resized crop to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_random_resize_to_video, label="Random resize", workers=workers, seed=seed,
+                      output_size=output_size)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\theft"
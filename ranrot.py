@@ -1,7 +1,12 @@
-import os
 import cv2
 import numpy as np
 import random
+from parallel import process_directory
+from geometry import rotation_matrix, warp_frame
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
+from schedule import sample_schedule, precompute, ScheduledTransform
 
 def apply_random_rotation(frame):
     # Define the rotation angle (random value between -30 and 30 degrees)
@@ -10,18 +15,19 @@ def apply_random_rotation(frame):
     # Get the height and width of the frame
     height, width = frame.shape[:2]
     
-    # Calculate the rotation center
-    center = (width / 2, height / 2)
-    
-    # Perform the rotation
-    rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
-    rotated_frame = cv2.warpAffine(frame, rotation_matrix, (width, height))
+    # Perform the rotation about the frame center
+    rotated_frame = warp_frame(frame, rotation_matrix(width, height, angle))
     
     return rotated_frame
 
-def apply_random_rotation_to_video(video_path, output_path, num_frames=None):
+def rotation_schedule(num_frames, width, height, schedule="per_frame", max_angle=30, step=None):
+    # Sample the clip's angles up front and build each distinct rotation matrix once
+    angles = sample_schedule(num_frames, -max_angle, max_angle, schedule, step=step)
+    return precompute(angles, lambda angle: rotation_matrix(width, height, angle))
+
+def apply_random_rotation_to_video(video_path, output_path, num_frames=None, schedule="per_frame", max_angle=30, step=None):
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Check if the video file was successfully opened
     if not cap.isOpened():
@@ -39,52 +45,44 @@ def apply_random_rotation_to_video(video_path, output_path, num_frames=None):
         num_frames = num_frames_total
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    out = open_video_writer(output_path, fps, (width, height))
 
     # Check if the output video file was successfully created
     if not out.isOpened():
         print(f"Error: Could not create output video file '{output_path}'")
         return
 
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # "per_frame" draws a new angle every frame like apply_random_rotation; "constant" and "smooth" keep the clip steady
+    rotate = ScheduledTransform(rotation_schedule(max(num_frames, 1), width, height, schedule, max_angle, step), warp_frame)
 
-        # Apply random rotation transformation
-        rotated_frame = apply_random_rotation(frame)
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                break
 
-        # Write the transformed frame to the output video
-        out.write(rotated_frame)
+            # Apply random rotation transformation
+            rotated_frame = telemetry.timed("transformed", rotate, frame)
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, rotated_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
-
-def process_videos_in_directory(input_dir, output_dir):
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply random rotation to the video
-            apply_random_rotation_to_video(input_video_path, output_video_path)
-            print(f"Random rotation applied to {filename}.")
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None, schedule="per_frame", max_angle=30, step=None):
+    # Apply random rotation to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_random_rotation_to_video, label="Random rotation", workers=workers, seed=seed,
+                      schedule=schedule, max_angle=max_angle, step=step)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\theft"
     output_dir = "C:\\Users\\Wilbert\\Desktop\\data\\augmented\\theftrot"
 
-    # Process all videos in the input directory
-    process_videos_in_directory(input_dir, output_dir)
+    # Process all videos in the input directory, drifting smoothly between angles instead of flickering
+    process_videos_in_directory(input_dir, output_dir, schedule="smooth", step=0.5)
 
     print("All videos processed successfully.")
 
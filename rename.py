@@ -1,8 +1,12 @@
 import os
+from catalog import Catalog
+from cache import rename_outputs
 
-def rename_files_in_directory(directory_path, prefix="", suffix=""):
-    # Get list of files in directory
-    files = os.listdir(directory_path)
+def rename_files_in_directory(directory_path, prefix="", suffix="", catalog_path=None):
+    # Get list of files in directory; hidden files (the augment manifest, unfinished .partial outputs) keep their names
+    files = [name for name in os.listdir(directory_path) if not name.startswith(".")]
+    catalog = Catalog(catalog_path) if catalog_path else None
+    renames = {}
     
     # Iterate over files and rename them
     for old_name in files:
@@ -11,7 +15,19 @@ def rename_files_in_directory(directory_path, prefix="", suffix=""):
         new_name = f"{prefix}{name}{suffix}{extension}"
         new_path = os.path.join(directory_path, new_name)
         os.rename(old_path, new_path)
+        renames[old_name] = new_name
+
+        # Keep the catalog's metadata and lineage attached to the renamed file
+        if catalog is not None:
+            catalog.rename(old_path, new_path)
+
+    if catalog is not None:
+        catalog.close()
+
+    # Point the manifest at the new names, so a re-run still skips these outputs
+    rename_outputs(directory_path, renames)
 
 # Example usage
-directory_path = "C:\\Users\\Wilbert\\Desktop\\data\\augmented\\theftstaticshear"
-rename_files_in_directory(directory_path, prefix="theft", suffix="shear")
+if __name__ == "__main__":
+    directory_path = "C:\\Users\\Wilbert\\Desktop\\data\\augmented\\theftstaticshear"
+    rename_files_in_directory(directory_path, prefix="theft", suffix="shear")
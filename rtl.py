@@ -1,46 +1,82 @@
-import os
-from moviepy.editor import VideoFileClip, ImageSequenceClip
-import numpy as np
-
-def flip_video_lr(video_path):
-    # Load video clip
-    video_clip = VideoFileClip(video_path)
-    
-    # List to store processed frames
-    processed_frames = []
-    
-    # Iterate over each frame
-    for frame in video_clip.iter_frames():
-        # Flip frame horizontally
-        processed_frame = np.fliplr(frame)
-        processed_frames.append(processed_frame)
-    
-    # Close the original clip
-    video_clip.close()
-    
-    # Convert processed frames to a new video clip
-    processed_clip = ImageSequenceClip(processed_frames, fps=video_clip.fps)
-    
-    return processed_clip
+import cv2
+from parallel import process_directory
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
+
+def flip_frame_lr(frame):
+    # Flip frame horizontally
+    return cv2.flip(frame, 1)
+
+def flip_frames_lr_batch(frames):
+    # Batched counterpart of flip_frame_lr: a zero-copy reversed view of the width axis of a (T, H, W, C) chunk
+    return frames[:, :, ::-1]
+
+def flip_video_lr(video_path, output_path, num_frames=None):
+    """
+    Flip each frame of the input video horizontally and stream it to a new video.
+
+    Frames are read, flipped and written one at a time, so memory use does not grow with the clip length.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+        output_path (str): The path to save the output video file.
+        num_frames (int): The number of frames to process. If None, process all frames. Default is None.
+    """
+    # Open video file
+    cap = open_video(video_path)
+
+    # Check if the video file was successfully opened
+    if not cap.isOpened():
+        print(f"Error: Could not open video file '{video_path}'")
+        return
+
+    # Get video properties
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # Determine the number of frames to process
+    if num_frames is None:
+        num_frames = num_frames_total
+
+    # Create output video
+    out = open_video_writer(output_path, fps, (width, height))
+
+    # Check if the output video file was successfully created
+    if not out.isOpened():
+        print(f"Error: Could not create output video file '{output_path}'")
+        return
+
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
+                break
+
+            # Flip the frame horizontally
+            flipped_frame = telemetry.timed("transformed", flip_frame_lr, frame)
+
+            # Write the flipped frame straight to the output video
+            telemetry.timed("encoded", out.write, flipped_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
+
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None):
+    # Flip all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, flip_video_lr, label="Horizontal flip",
+                      extensions=(".mov",), workers=workers, seed=seed)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\augmented\\shooting"  # Specify the input directory containing videos
     output_dir = "C:\\Users\\Wilbert\\Desktop\\data\\augmented\\shooting0"  # Specify the output directory for processed videos
 
-    # Create the output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".mov"):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Flip the video
-            processed_clip = flip_video_lr(input_video_path)
-            
-            # Save the processed video
-            processed_clip.write_videofile(output_video_path, codec="libx264")
+    # Process all videos in the input directory
+    process_videos_in_directory(input_dir, output_dir)
 
     print("All videos processed successfully.")
-
@@ -1,28 +1,36 @@
-import os
 import cv2
 import numpy as np
 import random
+from parallel import process_directory
+from noise import noise_rng, apply_salt_and_pepper, apply_salt_and_pepper_batch
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
 
-def apply_salt_effect(frame, saltiness=0.01):
+def apply_salt_effect(frame, saltiness=0.01, rng=None):
     """
     Apply salt effect to the frame by randomly adding white pixels.
     
     Parameters:
         frame (numpy.ndarray): The input frame.
         saltiness (float): The probability of adding a white pixel. Default is 0.01.
+        rng (numpy.random.Generator): The random generator. If None, one is seeded from np.random. Default is None.
     
     Returns:
         numpy.ndarray: The frame with salt effect applied.
     """
-    # Create a mask for salt pixels
-    mask = np.random.rand(*frame.shape[:2])
-    salt_pixels = mask < saltiness
-    
-    # Add white pixels (salt) to the frame
-    frame[salt_pixels] = 255
+    # Sample only the salt pixel positions and set them to white in place
+    apply_salt_and_pepper(frame, saltiness=saltiness, rng=rng)
     
     return frame
 
+def apply_salt_effect_batch(frames, saltiness=0.01, rng=None):
+    """
+    Batched counterpart of apply_salt_effect for a (T, H, W, C) chunk, modified in place.
+    The salt positions for every frame in the chunk come from a single draw.
+    """
+    return apply_salt_and_pepper_batch(frames, saltiness=saltiness, rng=rng)
+
 def apply_salt_effect_to_video(video_path, output_path, saltiness=0.01, num_frames=None):
     """
     Apply salt effect to each frame of the input video and save the result to a new video.
@@ -34,7 +42,7 @@ def apply_salt_effect_to_video(video_path, output_path, saltiness=0.01, num_fram
         num_frames (int): The number of frames to process. If None, process all frames. Default is None.
     """
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Check if the video file was successfully opened
     if not cap.isOpened():
@@ -52,34 +60,35 @@ def apply_salt_effect_to_video(video_path, output_path, saltiness=0.01, num_fram
         num_frames = num_frames_total
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    out = open_video_writer(output_path, fps, (width, height))
 
     # Check if the output video file was successfully created
     if not out.isOpened():
         print(f"Error: Could not create output video file '{output_path}'")
         return
 
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
-            break
-
-        # Apply salt effect to the frame
-        frame_with_salt = apply_salt_effect(frame, saltiness=saltiness)
+    # One random generator for the whole clip
+    rng = noise_rng()
 
-        # Write the transformed frame to the output video
-        out.write(frame_with_salt)
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
+                break
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Apply salt effect to the frame
+            frame_with_salt = telemetry.timed("transformed", apply_salt_effect, frame, saltiness=saltiness, rng=rng)
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, frame_with_salt)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-def process_videos_in_directory(input_dir, output_dir, saltiness=0.01):
+def process_videos_in_directory(input_dir, output_dir, saltiness=0.01, *, workers=1, seed=None):
     """
     Apply salt effect to all videos in the input directory and save the results to the output directory.
     
@@ -87,19 +96,11 @@ def process_videos_in_directory(input_dir, output_dir, saltiness=0.01):
         input_dir (str): The path to the input directory containing video files.
         output_dir (str): The path to the output directory to save processed videos.
         saltiness (float): The probability of adding a white pixel. Default is 0.01.
+        workers (int): The number of worker processes. Default is 1 (one file at a time).
+        seed (int): The base random seed; seeded runs give the same output for any worker count. Default is None.
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply salt effect to the video
-            apply_salt_effect_to_video(input_video_path, output_video_path, saltiness=saltiness)
-            print(f"Salt effect applied to {filename}.")
+    process_directory(input_dir, output_dir, apply_salt_effect_to_video, label="Salt effect",
+                      workers=workers, seed=seed, saltiness=saltiness)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\assault"
@@ -0,0 +1,160 @@
+import cv2
+import numpy as np
+
+from framestore import open_video
+
+# Gaps up to this many frames are skipped with grab(); longer gaps (and backward steps) seek instead.
+# A seek lands on the previous keyframe and decodes forward from there, so it only pays off once the
+# gap is about a GOP long; 64 frames covers the 1-2 second GOPs typical of CCTV and phone footage.
+SEEK_THRESHOLD = 64
+
+def select_frame_indices(num_frames_total, fps, stride=1, start_time=None, end_time=None, num_clips=None, clip_len=16):
+    """
+    Choose which frames of a video to read.
+
+    Parameters:
+        num_frames_total (int): The number of frames in the video.
+        fps (float): The frame rate, used to turn times into frame indices.
+        stride (int): Keep every `stride`-th frame. Default is 1.
+        start_time (float): The start of the time range in seconds. If None, start at the first frame. Default is None.
+        end_time (float): The end of the time range in seconds (exclusive). If None, run to the end. Default is None.
+        num_clips (int): If set, take this many uniformly spaced clips from the range instead of the whole range.
+            Default is None.
+        clip_len (int): The number of frames per clip (after the stride). Default is 16.
+
+    Returns:
+        list: The sorted frame indices; overlapping clips repeat indices.
+    """
+    first = 0 if start_time is None else int(round(start_time * fps))
+    last = num_frames_total if end_time is None else int(round(end_time * fps))
+    first, last = max(first, 0), min(last, num_frames_total)
+    if last <= first:
+        return []
+
+    if num_clips is None:
+        return list(range(first, last, stride))
+
+    # Spread the clip starts evenly so the first clip starts at the range start and the last ends at its end
+    span = (clip_len - 1) * stride + 1
+    starts = np.linspace(first, max(last - span, first), num_clips).round().astype(int)
+    indices = []
+    for start in starts:
+        indices.extend(range(start, min(start + span, last), stride))
+    return indices
+
+def _skip_to(cap, position, index, seek_threshold):
+    # Move the capture from `position` to just before frame `index`; returns the new position or None at the end
+    gap = index - position
+    if gap < 0 or gap > seek_threshold:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if position > index:
+            # The backend landed past the target; go back far enough to walk forward onto it
+            cap.set(cv2.CAP_PROP_POS_FRAMES, max(index - seek_threshold, 0))
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+    # Skip the remaining frames without converting them
+    while position < index:
+        if not cap.grab():
+            return None
+        position += 1
+    return position
+
+def read_frames_at(cap, indices, seek_threshold=SEEK_THRESHOLD, image=None):
+    """
+    Read only the given frames of a video, in the given (non-decreasing) order.
+
+    Frames between two wanted frames are skipped with grab(), which never runs retrieve()'s colour
+    conversion and copy; gaps longer than `seek_threshold` are skipped with a CAP_PROP_POS_FRAMES seek,
+    which jumps to the nearest keyframe so the frames before it are not decoded at all.
+
+    Parameters:
+        cap (cv2.VideoCapture): The opened video (or a MemmapCapture).
+        indices (iterable): The frame indices to read.
+        seek_threshold (int): The longest gap to skip by grabbing. Default is SEEK_THRESHOLD.
+        image (numpy.ndarray): An optional buffer to decode into, as with cap.read(image). Default is None.
+
+    Yields:
+        tuple: (index, frame) for every wanted frame that could be read.
+    """
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    for index in indices:
+        position = _skip_to(cap, position, index, seek_threshold)
+        if position is None or not cap.grab():
+            return
+        position += 1
+        ret, frame = cap.retrieve(image)
+        if not ret:
+            return
+        yield index, frame
+
+class SelectedCapture:
+    """
+    A cv2.VideoCapture look-alike that only returns the selected frames of another capture.
+
+    It reports the number of selected frames as CAP_PROP_FRAME_COUNT and the frame rate divided by the
+    stride as CAP_PROP_FPS, so a writer opened from it keeps the clip's real-time duration.
+    """
+
+    def __init__(self, cap, indices, stride=1, seek_threshold=SEEK_THRESHOLD):
+        self._cap = cap
+        self._indices = list(indices)
+        self._stride = stride
+        self._seek_threshold = seek_threshold
+        self._frames_read = 0
+        self._position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def read(self, image=None):
+        if self._frames_read >= len(self._indices):
+            return False, None
+        self._position = _skip_to(self._cap, self._position, self._indices[self._frames_read], self._seek_threshold)
+        if self._position is None or not self._cap.grab():
+            self._frames_read = len(self._indices)
+            return False, None
+        self._position += 1
+        self._frames_read += 1
+        return self._cap.retrieve(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self._indices))
+        if prop == cv2.CAP_PROP_FPS:
+            return self._cap.get(cv2.CAP_PROP_FPS) / self._stride
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._frames_read)
+        return self._cap.get(prop)
+
+    def release(self):
+        self._cap.release()
+
+def select_frames(cap, stride=1, start_time=None, end_time=None, num_clips=None, clip_len=16,
+                  seek_threshold=SEEK_THRESHOLD):
+    """
+    Wrap an opened capture so reading it returns only the selected frames (see select_frame_indices).
+
+    Returns:
+        SelectedCapture: A capture with the usual isOpened/read/get/release interface.
+    """
+    num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    indices = select_frame_indices(num_frames_total, fps, stride, start_time, end_time, num_clips, clip_len)
+    return SelectedCapture(cap, indices, stride=stride, seek_threshold=seek_threshold)
+
+def open_selected_video(video_path, **selection):
+    """
+    Open a video (through the frame store when enabled) and select frames from it.
+
+    Parameters:
+        video_path (str): The path to the input video file.
+        **selection: stride, start_time, end_time, num_clips, clip_len and seek_threshold, as for select_frames.
+
+    Returns:
+        SelectedCapture or cv2.VideoCapture: The selected capture, or the plain capture if it could not be opened.
+    """
+    cap = open_video(video_path)
+    if not cap.isOpened():
+        return cap
+    return select_frames(cap, **selection)
@@ -0,0 +1,91 @@
+import random
+import numpy as np
+
+SCHEDULE_MODES = ("constant", "smooth", "per_frame")
+
+def sample_schedule(num_frames, low, high, mode="constant", size=None, num_keyframes=4, step=None):
+    """
+    Sample a random parameter for every frame of a clip before decoding it.
+
+    Values are drawn with the `random` module, like the per-frame ops, so seeded runs stay reproducible;
+    "per_frame" draws in the same order as calling random.uniform(low, high) once per frame (and per
+    element when `size` is given).
+
+    Parameters:
+        num_frames (int): The number of frames in the clip.
+        low (float): The lower bound of the parameter.
+        high (float): The upper bound of the parameter.
+        mode (str): "constant" (one value for the whole clip), "smooth" (values drawn at `num_keyframes`
+            evenly spaced frames and linearly interpolated in between) or "per_frame" (an independent value
+            per frame). Default is "constant".
+        size (int): The number of values per frame (e.g. 3 for per-channel factors). If None, one. Default is None.
+        num_keyframes (int): The number of keyframes of a "smooth" schedule. Default is 4.
+        step (float): If given, round values to multiples of `step`, so neighbouring frames of a "smooth"
+            schedule share parameters (and precomputed transforms). Default is None.
+
+    Returns:
+        numpy.ndarray: The float64 schedule, (num_frames,) or (num_frames, size).
+    """
+    width = 1 if size is None else size
+    if mode == "constant":
+        values = np.tile([random.uniform(low, high) for _ in range(width)], (num_frames, 1))
+    elif mode == "smooth":
+        num_keyframes = max(2, min(num_keyframes, num_frames))
+        positions = np.linspace(0, num_frames - 1, num_keyframes)
+        keyframes = np.array([[random.uniform(low, high) for _ in range(width)] for _ in range(num_keyframes)])
+        frames = np.arange(num_frames)
+        values = np.stack([np.interp(frames, positions, keyframes[:, c]) for c in range(width)], axis=1)
+    elif mode == "per_frame":
+        values = np.array([[random.uniform(low, high) for _ in range(width)] for _ in range(num_frames)])
+    else:
+        raise ValueError(f"Unknown schedule mode '{mode}', expected one of {SCHEDULE_MODES}")
+
+    values = np.asarray(values, dtype=np.float64).reshape(num_frames, width)
+    if step is not None:
+        values = np.clip(np.round(values / step) * step, low, high)
+    return values[:, 0] if size is None else values
+
+def precompute(schedule, build):
+    """
+    Build the transform (matrix, lookup table, ...) of every frame of a schedule ahead of decoding.
+
+    Frames with the same parameters share one transform, so a constant schedule costs a single build
+    and a quantized smooth schedule one build per distinct step.
+
+    Parameters:
+        schedule (numpy.ndarray): A schedule from sample_schedule.
+        build (callable): Maps one frame's parameters (a scalar or a row) to its transform.
+
+    Returns:
+        list: One transform per frame; repeated parameters give the same object.
+    """
+    cache = {}
+    transforms = []
+    for params in schedule:
+        key = np.asarray(params).tobytes()
+        if key not in cache:
+            cache[key] = build(params)
+        transforms.append(cache[key])
+    return transforms
+
+class ScheduledTransform:
+    """
+    A per-frame function that applies precomputed transforms in frame order.
+
+    Frames past the end of the schedule (e.g. when the container under-reports its frame count) reuse the
+    last transform.
+
+    Parameters:
+        transforms (list): One transform per frame, e.g. from precompute.
+        apply (callable): apply(frame, transform) -> transformed frame.
+    """
+
+    def __init__(self, transforms, apply):
+        self.transforms = transforms
+        self.apply = apply
+        self.index = 0
+
+    def __call__(self, frame):
+        transform = self.transforms[min(self.index, len(self.transforms) - 1)]
+        self.index += 1
+        return self.apply(frame, transform)
@@ -0,0 +1,429 @@
+import io
+import json
+import os
+import random
+import tarfile
+import tempfile
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+
+from framestore import open_video
+from parallel import file_seed
+from sampling import select_frames
+from telemetry import telemetry
+
+# Shards roll over once they pass this size; large enough for sequential reads, small enough to shuffle
+MAX_SHARD_BYTES = 1024 ** 3
+
+# The index written next to the shards
+INDEX_NAME = "index.json"
+
+# Extension of clip members inside a shard
+CLIP_EXTENSION = ".raw.zlib"
+
+# Frames per independently compressed chunk of a clip; a reader decompresses only the chunks it needs
+CHUNK_FRAMES = 8
+
+class ShardClipWriter:
+    """
+    A cv2.VideoWriter look-alike that compresses frames into one clip of a shard as they arrive.
+
+    Frames are zlib-compressed into a spooled temp file as they are written, so a long clip is never
+    held uncompressed in memory; release() appends the finished clip to the shard. Every `chunk_frames`
+    frames make one complete zlib stream, and the offset of each stream within the clip is indexed.
+    """
+
+    def __init__(self, shard_writer, key, fps, frame_size, metadata=None):
+        self._shard_writer = shard_writer
+        self._key = key
+        self._fps = fps
+        self._frame_shape = (frame_size[1], frame_size[0], 3)
+        self._metadata = metadata or {}
+        self._compressor = None
+        self._chunk_offsets = []
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=64 * 1024 ** 2)
+        self._num_frames = 0
+
+    def isOpened(self):
+        return self._buffer is not None
+
+    def write(self, frame):
+        if frame.shape != self._frame_shape:
+            raise ValueError(f"Frame of shape {frame.shape} written to clip '{self._key}', "
+                             f"which was opened for {self._frame_shape}")
+        if self._compressor is None:
+            # Start the next chunk
+            self._chunk_offsets.append(self._buffer.tell())
+            self._compressor = zlib.compressobj(self._shard_writer.compression_level)
+        self._buffer.write(self._compressor.compress(np.ascontiguousarray(frame, dtype=np.uint8).data))
+        self._num_frames += 1
+        if self._num_frames % self._shard_writer.chunk_frames == 0:
+            self._buffer.write(self._compressor.flush())
+            self._compressor = None
+
+    def release(self):
+        if self._buffer is None:
+            return
+        if self._compressor is not None:
+            self._buffer.write(self._compressor.flush())
+            self._compressor = None
+        if self._num_frames:
+            self._shard_writer.add_member(self._key, self._buffer, (self._num_frames,) + self._frame_shape,
+                                          self._fps, self._metadata, self._chunk_offsets)
+        self._buffer.close()
+        self._buffer = None
+
+class ShardWriter:
+    """
+    Pack clips into tar shards of zlib-compressed uint8 frames, with an index of byte offsets.
+
+    Each clip is one tar member whose PAX headers carry its shape and frame rate, so a shard can be
+    streamed without the index; the index maps every clip to its shard, data offset and size, and to the
+    offsets of its compressed chunks, so a single clip or a range of its frames can be fetched with one seek.
+
+    Parameters:
+        shard_dir (str): The directory to write the shards and the index to.
+        prefix (str): The shard file name prefix. Default is "shard".
+        max_shard_bytes (int): Start a new shard once the current one passes this size. Default is MAX_SHARD_BYTES.
+        compression_level (int): The zlib level; 1 is fast and already shrinks video frames well. Default is 1.
+        chunk_frames (int): The number of frames compressed together. Default is CHUNK_FRAMES.
+    """
+
+    def __init__(self, shard_dir, prefix="shard", max_shard_bytes=MAX_SHARD_BYTES, compression_level=1,
+                 chunk_frames=CHUNK_FRAMES):
+        os.makedirs(shard_dir, exist_ok=True)
+        self.shard_dir = shard_dir
+        self.prefix = prefix
+        self.max_shard_bytes = max_shard_bytes
+        self.compression_level = compression_level
+        self.chunk_frames = chunk_frames
+        self.index = {}
+        self._tar = None
+        self._shard_name = None
+        self._shard_count = 0
+
+    def _open_shard(self):
+        self._shard_name = f"{self.prefix}-{self._shard_count:05d}.tar"
+        self._shard_count += 1
+        self._tar = tarfile.open(os.path.join(self.shard_dir, self._shard_name), "w", format=tarfile.PAX_FORMAT)
+
+    def open_clip(self, key, fps, frame_size, metadata=None):
+        """
+        Start a clip that is filled frame by frame, like a video writer.
+
+        Returns:
+            ShardClipWriter: A writer with the VideoWriter isOpened/write/release interface.
+        """
+        return ShardClipWriter(self, key, fps, frame_size, metadata)
+
+    def add_clip(self, key, frames, fps=30.0, metadata=None):
+        """Add a whole (T, H, W, C) uint8 clip."""
+        frames = np.asarray(frames, dtype=np.uint8)
+        writer = self.open_clip(key, fps, (frames.shape[2], frames.shape[1]), metadata)
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+
+    def add_member(self, key, data, shape, fps, metadata, chunk_offsets):
+        # Append one compressed clip (a file object positioned anywhere) to the current shard
+        if key in self.index:
+            raise ValueError(f"Clip '{key}' is already in the shards")
+        if self._tar is None or self._tar.offset >= self.max_shard_bytes:
+            self.close_shard()
+            self._open_shard()
+
+        size = data.seek(0, io.SEEK_END)
+        data.seek(0)
+        info = tarfile.TarInfo(key + CLIP_EXTENSION)
+        info.size = size
+        info.pax_headers = {"video_aug.shape": ",".join(map(str, shape)), "video_aug.fps": repr(float(fps))}
+        self._tar.addfile(info, data)
+
+        # The data sits right before the end of the member, padded to whole 512-byte tar blocks
+        offset = self._tar.offset - -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        self.index[key] = {"shard": self._shard_name, "offset": offset, "size": size,
+                           "shape": list(shape), "fps": fps, "metadata": metadata,
+                           "chunk_frames": self.chunk_frames, "chunks": list(chunk_offsets)}
+
+    def close_shard(self):
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+    def close(self):
+        """Finish the current shard and write the index."""
+        self.close_shard()
+        write_index(self.shard_dir, self.index)
+
+def write_index(shard_dir, index):
+    """Write the shard index atomically."""
+    path = os.path.join(shard_dir, INDEX_NAME)
+    temp_path = path + ".partial"
+    with open(temp_path, "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+def _iter_chunks(f, size, block_size=1024 ** 2):
+    # Split `size` bytes of back-to-back zlib streams read from `f` into the decompressed chunks, reading
+    # a block at a time so neither the whole compressed clip nor the whole decoded clip is held at once
+    decompressor = zlib.decompressobj()
+    parts = []
+    pending = b""
+    remaining = size
+    while pending or remaining:
+        if not pending:
+            pending = f.read(min(block_size, remaining))
+            if not pending:
+                break
+            remaining -= len(pending)
+        parts.append(decompressor.decompress(pending))
+        pending = b""
+        if decompressor.eof:
+            yield b"".join(parts)
+            pending = decompressor.unused_data
+            decompressor = zlib.decompressobj()
+            parts = []
+    if parts:
+        raise IOError("Truncated clip data in shard")
+
+def _frames_of(chunk, shape):
+    return np.frombuffer(chunk, dtype=np.uint8).reshape((-1,) + tuple(shape[1:]))
+
+class ShardReader:
+    """
+    Read clips back from a shard directory.
+
+    Parameters:
+        shard_dir (str): The directory holding the shards and the index.
+    """
+
+    def __init__(self, shard_dir):
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, INDEX_NAME)) as f:
+            self.index = json.load(f)
+
+    def keys(self):
+        return list(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def iter_frames(self, key, start=0, stop=None):
+        """
+        Stream frames [start, stop) of one clip with a single seek, decompressing only the chunks that hold them.
+
+        Yields:
+            numpy.ndarray: Each (H, W, C) uint8 frame (read-only).
+        """
+        entry = self.index[key]
+        num_frames = entry["shape"][0]
+        stop = num_frames if stop is None else min(stop, num_frames)
+        if start >= stop:
+            return
+        # Indexes written before clips were chunked hold the whole clip as one chunk
+        chunk_frames = entry.get("chunk_frames", num_frames)
+        chunks = entry.get("chunks", [0]) + [entry["size"]]
+        first, last = start // chunk_frames, (stop - 1) // chunk_frames
+
+        with open(os.path.join(self.shard_dir, entry["shard"]), "rb") as f:
+            f.seek(entry["offset"] + chunks[first])
+            data = _iter_chunks(f, chunks[last + 1] - chunks[first])
+            for chunk_index, chunk in enumerate(data, first):
+                chunk_start = chunk_index * chunk_frames
+                for frame in _frames_of(chunk, entry["shape"])[max(start - chunk_start, 0):stop - chunk_start]:
+                    yield frame
+
+    def read_clip(self, key, start=0, stop=None):
+        """
+        Fetch one clip, or frames [start, stop) of it, with a single seek.
+
+        Returns:
+            numpy.ndarray: The (T, H, W, C) uint8 clip.
+        """
+        shape = self.index[key]["shape"]
+        stop = shape[0] if stop is None else min(stop, shape[0])
+        clip = np.empty((max(stop - start, 0),) + tuple(shape[1:]), dtype=np.uint8)
+        for i, frame in enumerate(self.iter_frames(key, start, stop)):
+            clip[i] = frame
+        return clip
+
+    def shards(self):
+        return sorted({entry["shard"] for entry in self.index.values()})
+
+    def iter_shard(self, shard_name):
+        """
+        Stream every clip of a shard in file order, without the index or any seeks.
+
+        Yields:
+            tuple: (key, clip, fps) for each clip.
+        """
+        with tarfile.open(os.path.join(self.shard_dir, shard_name), "r|") as tar:
+            for info in tar:
+                if not info.name.endswith(CLIP_EXTENSION):
+                    continue
+                shape = tuple(int(n) for n in info.pax_headers["video_aug.shape"].split(","))
+                fps = float(info.pax_headers["video_aug.fps"])
+                # Decode chunk by chunk straight into the clip instead of inflating the whole member at once
+                clip = np.empty(shape, dtype=np.uint8)
+                position = 0
+                for chunk in _iter_chunks(tar.extractfile(info), info.size):
+                    frames = _frames_of(chunk, shape)
+                    clip[position:position + len(frames)] = frames
+                    position += len(frames)
+                yield info.name[:-len(CLIP_EXTENSION)], clip, fps
+
+    def __iter__(self):
+        for shard_name in self.shards():
+            for key, clip, _ in self.iter_shard(shard_name):
+                yield key, clip
+
+def pack_video(shard_writer, video_path, transforms, key_prefix="", metadata=None, num_frames=None, selection=None):
+    """
+    Decode a video once and write one clip per transform into the shards, in the same pass.
+
+    Parameters:
+        shard_writer (ShardWriter): The shards to write to.
+        video_path (str): The path to the input video file.
+        transforms (dict): Mapping of augmentation name to a per-frame function (frame -> frame).
+        key_prefix (str): Prepended to the clip keys, e.g. the class name. Default is "".
+        metadata (dict): Extra metadata stored with every clip. Default is None.
+        num_frames (int): The number of frames to process. If None, process all frames. Default is None.
+        selection (dict): Frame selection, see sampling.select_frames. Default is None.
+    """
+    # Open video file
+    cap = open_video(video_path)
+    if selection and cap.isOpened():
+        cap = select_frames(cap, **selection)
+
+    # Check if the video file was successfully opened
+    if not cap.isOpened():
+        print(f"Error: Could not open video file '{video_path}'")
+        return
+
+    # Get video properties
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # Determine the number of frames to process
+    if num_frames is None:
+        num_frames = num_frames_total
+
+    # One clip per transform, keyed <prefix><augmentation>/<video file name>; the extension stays in the
+    # key so a.mp4 and a.mov get separate clips
+    name = os.path.basename(video_path)
+    items = list(transforms.items())
+    writers = [None] * len(items)
+
+    for i in range(num_frames):
+        ret, frame = telemetry.read_frame(cap)
+        if not ret:
+            break
+
+        for j, (augmentation, transform) in enumerate(items):
+            # Every transform but the last gets its own copy, as some modify the frame in place
+            source = frame if j == len(items) - 1 else frame.copy()
+            transformed_frame = telemetry.timed("transformed", transform, source)
+
+            if writers[j] is None:
+                height, width = transformed_frame.shape[:2]
+                clip_metadata = dict(metadata or {}, augmentation=augmentation, source=os.path.basename(video_path))
+                writers[j] = shard_writer.open_clip(f"{key_prefix}{augmentation}/{name}", fps, (width, height),
+                                                    clip_metadata)
+            telemetry.timed("encoded", writers[j].write, transformed_frame)
+
+    # Release video capture and clip writers
+    cap.release()
+    for writer in writers:
+        if writer is not None:
+            writer.release()
+
+def _pack_files(input_dir, filenames, shard_dir, prefix, transforms, class_name, seed, max_shard_bytes, selection):
+    shard_writer = ShardWriter(shard_dir, prefix=prefix, max_shard_bytes=max_shard_bytes)
+    for filename in filenames:
+        if seed is not None:
+            random.seed(file_seed(seed, filename))
+            np.random.seed(file_seed(seed, filename))
+        pack_video(shard_writer, os.path.join(input_dir, filename), transforms, key_prefix=class_name or "",
+                   metadata={"class": class_name} if class_name else None, selection=selection)
+        print(f"{len(transforms)} augmentations of {filename} packed into shards.")
+    shard_writer.close_shard()
+    return shard_writer.index
+
+def pack_videos_in_directory(input_dir, shard_dir, transforms, *, class_name=None, workers=1, seed=None,
+                             max_shard_bytes=MAX_SHARD_BYTES, selection=None, extensions=(".mp4", ".mov")):
+    """
+    Augment all videos in the input directory straight into shards instead of one mp4 per augmentation.
+
+    Each worker process writes its own sequence of shards, so no two processes append to the same file.
+    A run writes its shards under a fresh run prefix and only then swaps in the new index and deletes
+    the class's older shards, so a crashed run leaves the previous shards and index readable.
+
+    Parameters:
+        input_dir (str): The path to the input directory containing video files.
+        shard_dir (str): The directory to write the shards and the index to.
+        transforms (dict): Mapping of augmentation name to a per-frame function (frame -> frame).
+        class_name (str): The class of the videos, used as the key prefix and stored as metadata. Default is None.
+        workers (int): The number of worker processes. Default is 1.
+        seed (int): The base random seed; seeded runs give the same clips for any worker count. Default is None.
+        max_shard_bytes (int): The shard size to roll over at. Default is MAX_SHARD_BYTES.
+        selection (dict): Frame selection applied to every video, see sampling.select_frames. Default is None.
+        extensions (tuple): The file extensions to process. Default is (".mp4", ".mov").
+    """
+    filenames = [filename for filename in os.listdir(input_dir) if filename.endswith(extensions)]
+    filenames.sort(key=lambda filename: os.path.getsize(os.path.join(input_dir, filename)), reverse=True)
+    base_prefix = f"{class_name}-shard" if class_name else "shard"
+    run_prefix = f"{base_prefix}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(shard_dir, exist_ok=True)
+
+    if workers <= 1:
+        index = _pack_files(input_dir, filenames, shard_dir, run_prefix, transforms, class_name, seed,
+                            max_shard_bytes, selection)
+    else:
+        # Deal the files out round-robin (largest first) so the workers get similar amounts of video
+        index = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_pack_files, input_dir, filenames[n::workers], shard_dir,
+                                       f"{run_prefix}-w{n}", transforms, class_name, seed, max_shard_bytes,
+                                       selection) for n in range(workers)]
+            for future in futures:
+                index.update(future.result())
+
+    # Keep the clips of other classes that share the shard directory
+    index_path = os.path.join(shard_dir, INDEX_NAME)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            previous = json.load(f)
+        kept = {key: entry for key, entry in previous.items() if not entry["shard"].startswith(base_prefix + "-")}
+        index = dict(kept, **index)
+    write_index(shard_dir, index)
+
+    # Only now that the index points at the new shards, drop this class's shards from earlier
+    # (finished or crashed) runs
+    for shard_name in os.listdir(shard_dir):
+        if (shard_name.startswith(base_prefix + "-") and shard_name.endswith(".tar")
+                and not shard_name.startswith(run_prefix + "-")):
+            os.remove(os.path.join(shard_dir, shard_name))
+
+if __name__ == "__main__":
+    from functools import partial
+    from ranrot import apply_random_rotation
+    from mul import apply_random_multiply
+    from salt import apply_salt_effect
+
+    class_name = "shooting"
+    input_dir = f"C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\{class_name}"
+    shard_dir = "C:\\Users\\Wilbert\\Desktop\\data\\shards"
+
+    transforms = {
+        "rot": apply_random_rotation,
+        "multiply": apply_random_multiply,
+        "salt": partial(apply_salt_effect, saltiness=0.01),
+    }
+
+    # Pack all augmented videos of the class into shards
+    pack_videos_in_directory(input_dir, shard_dir, transforms, class_name=class_name)
+
+    print("All videos processed successfully.")
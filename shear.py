@@ -1,8 +1,12 @@
 
-import os
 import cv2
 import numpy as np
 import random
+from parallel import process_directory
+from geometry import shear_matrix, warp_frame
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
 
 def apply_static_shear_effect(frame, shear_factor):
     """
@@ -15,11 +19,8 @@ def apply_static_shear_effect(frame, shear_factor):
     Returns:
         numpy.ndarray: The frame with static shear effect applied.
     """
-    # Define the transformation matrix
-    M = np.array([[1, shear_factor, 0], [0, 1, 0]])
-    
     # Apply the transformation
-    sheared_frame = cv2.warpAffine(frame, M, (frame.shape[1], frame.shape[0]))
+    sheared_frame = warp_frame(frame, shear_matrix(shear_factor))
     
     return sheared_frame
 
@@ -33,7 +34,7 @@ def apply_static_shear_effect_to_video(video_path, output_path, shear_factor):
         shear_factor (float): The shear factor to apply.
     """
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Check if the video file was successfully opened
     if not cap.isOpened():
@@ -47,34 +48,35 @@ def apply_static_shear_effect_to_video(video_path, output_path, shear_factor):
     num_frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    out = open_video_writer(output_path, fps, (width, height))
 
     # Check if the output video file was successfully created
     if not out.isOpened():
         print(f"Error: Could not create output video file '{output_path}'")
         return
 
-    # Iterate over frames
-    for i in range(num_frames_total):
-        ret, frame = cap.read()
-        if not ret:
-            print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
-            break
-
-        # Apply static shear effect to the frame
-        sheared_frame = apply_static_shear_effect(frame, shear_factor)
+    # The shear is the same for every frame, so build the matrix once
+    M = shear_matrix(shear_factor)
 
-        # Write the transformed frame to the output video
-        out.write(sheared_frame)
+    try:
+        # Iterate over frames
+        for i in range(num_frames_total):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                print(f"Warning: End of video '{video_path}' reached at frame {i + 1}.")
+                break
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Apply static shear effect to the frame
+            sheared_frame = telemetry.timed("transformed", warp_frame, frame, M, (width, height))
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, sheared_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-def process_videos_in_directory(input_dir, output_dir, shear_factor):
+def process_videos_in_directory(input_dir, output_dir, shear_factor, *, workers=1, seed=None):
     """
     Apply static shear effect to all videos in the input directory and save the results to the output directory.
     
@@ -82,19 +84,11 @@ def process_videos_in_directory(input_dir, output_dir, shear_factor):
         input_dir (str): The path to the input directory containing video files.
         output_dir (str): The path to the output directory to save processed videos.
         shear_factor (float): The shear factor to apply.
+        workers (int): The number of worker processes. Default is 1 (one file at a time).
+        seed (int): The base random seed; seeded runs give the same output for any worker count. Default is None.
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply static shear effect to the video
-            apply_static_shear_effect_to_video(input_video_path, output_video_path, shear_factor)
-            print(f"Static shear effect applied to {filename}.")
+    process_directory(input_dir, output_dir, apply_static_shear_effect_to_video, label="Static shear effect",
+                      workers=workers, seed=seed, shear_factor=shear_factor)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\assault"
@@ -1,10 +1,91 @@
-import os
 import cv2
 import numpy as np
+from parallel import process_directory
+from telemetry import telemetry
+from framestore import open_video
+from encoder import open_video_writer
+
+def apply_superpixel_effect(frame):
+    # Calculate number of superpixels based on frame dimensions
+    height, width = frame.shape[:2]
+    num_superpixels = int((width * height) ** 0.5 / 4)
+
+    # Apply Superpixel Segmentation
+    slic = cv2.ximgproc.createSuperpixelSLIC(frame, cv2.ximgproc.SLICO, num_superpixels)
+    slic.iterate()
+    mask = slic.getLabelContourMask()
+    superpixel_frame = cv2.bitwise_and(frame, frame, mask=mask)
+
+    return superpixel_frame
+
+def label_contour_mask(labels):
+    # 255 where a pixel's label differs from its right or lower neighbour, like getLabelContourMask(thick_line=False)
+    mask = np.zeros(labels.shape, dtype=np.uint8)
+    mask[:, :-1][labels[:, :-1] != labels[:, 1:]] = 255
+    mask[:-1, :][labels[:-1, :] != labels[1:, :]] = 255
+    return mask
+
+def scene_thumbnail(frame, size=(64, 36)):
+    # A tiny grayscale copy of the frame for cheap scene-change checks
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+class IncrementalSuperpixels:
+    # Per-frame superpixel effect that only reruns SLIC every `refresh_interval` frames, or sooner when the
+    # mean absolute difference of a 64x36 grayscale thumbnail against the last segmented frame exceeds
+    # `change_threshold` (grey levels); in between, the previous contour mask is reused. OpenCV's SLIC
+    # cannot be seeded with earlier labels, so reuse stands in for a warm start. With `downscale` < 1,
+    # SLIC runs on a smaller frame and its labels are upsampled (nearest) before the contours are drawn.
+
+    def __init__(self, refresh_interval=8, change_threshold=12.0, downscale=1.0, iterations=10):
+        self.refresh_interval = refresh_interval
+        self.change_threshold = change_threshold
+        self.downscale = downscale
+        self.iterations = iterations
+        self._mask = None
+        self._thumbnail = None
+        self._frames_since_refresh = 0
+
+    def _needs_refresh(self, frame, thumbnail):
+        if self._mask is None or self._mask.shape != frame.shape[:2]:
+            return True
+        if self._frames_since_refresh >= self.refresh_interval:
+            return True
+        if self.change_threshold is not None:
+            return np.abs(thumbnail - self._thumbnail).mean() > self.change_threshold
+        return False
+
+    def _segment(self, frame):
+        # Same region size as apply_superpixel_effect, scaled with the frame so the segments cover the same area
+        height, width = frame.shape[:2]
+        num_superpixels = int((width * height) ** 0.5 / 4)
+        if self.downscale >= 1.0:
+            slic = cv2.ximgproc.createSuperpixelSLIC(frame, cv2.ximgproc.SLICO, num_superpixels)
+            slic.iterate(self.iterations)
+            return slic.getLabelContourMask()
+
+        small = cv2.resize(frame, None, fx=self.downscale, fy=self.downscale, interpolation=cv2.INTER_AREA)
+        region_size = max(int(num_superpixels * self.downscale), 2)
+        slic = cv2.ximgproc.createSuperpixelSLIC(small, cv2.ximgproc.SLICO, region_size)
+        slic.iterate(self.iterations)
+        labels = cv2.resize(slic.getLabels(), (width, height), interpolation=cv2.INTER_NEAREST)
+        return label_contour_mask(labels)
+
+    def __call__(self, frame):
+        thumbnail = scene_thumbnail(frame) if self.change_threshold is not None else None
+        if self._needs_refresh(frame, thumbnail):
+            self._mask = self._segment(frame)
+            self._thumbnail = thumbnail
+            self._frames_since_refresh = 0
+        self._frames_since_refresh += 1
+        return cv2.bitwise_and(frame, frame, mask=self._mask)
+
+def apply_superpixel(video_path, output_path, num_frames=None, refresh_interval=8, change_threshold=12.0, downscale=1.0):
+    # refresh_interval=1 reruns SLIC on every frame, as before
+    superpixels = IncrementalSuperpixels(refresh_interval, change_threshold, downscale)
 
-def apply_superpixel(video_path, output_path, num_frames=None):
     # Open video file
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     
     # Get video properties
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -17,46 +98,29 @@ def apply_superpixel(video_path, output_path, num_frames=None):
         num_frames = num_frames_total
 
     # Create output video
-    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
-
-    # Calculate number of superpixels based on frame dimensions
-    num_superpixels = int((width * height) ** 0.5 / 4)
-
-    # Iterate over frames
-    for i in range(num_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
+    out = open_video_writer(output_path, fps, (width, height))
 
-        # Apply Superpixel Segmentation
-        slic = cv2.ximgproc.createSuperpixelSLIC(frame, cv2.ximgproc.SLICO, num_superpixels)
-        slic.iterate()
-        mask = slic.getLabelContourMask()
-        superpixel_frame = cv2.bitwise_and(frame, frame, mask=mask)
+    try:
+        # Iterate over frames
+        for i in range(num_frames):
+            ret, frame = telemetry.read_frame(cap)
+            if not ret:
+                break
 
-        # Write the transformed frame to the output video
-        out.write(superpixel_frame)
+            # Apply Superpixel Segmentation
+            superpixel_frame = telemetry.timed("transformed", superpixels, frame)
 
-        # Print progress
-        print(f"Processed frame {i + 1}/{num_frames_total} for video {video_path}")
+            # Write the transformed frame to the output video
+            telemetry.timed("encoded", out.write, superpixel_frame)
+    finally:
+        # Release video capture and writer
+        cap.release()
+        out.release()
 
-    # Release video capture and writer
-    cap.release()
-    out.release()
-
-def process_videos_in_directory(input_dir, output_dir):
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Iterate over all files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith((".mp4",".mov")):  # Adjust this condition based on your file types
-            input_video_path = os.path.join(input_dir, filename)
-            output_video_path = os.path.join(output_dir, filename)
-            
-            # Apply Superpixel Transform to the video
-            apply_superpixel(input_video_path, output_video_path)
-            print(f"Superpixel Transform applied to {filename}.")
+def process_videos_in_directory(input_dir, output_dir, *, workers=1, seed=None, refresh_interval=8, change_threshold=12.0, downscale=1.0):
+    # Apply Superpixel Transform to all videos, spread across `workers` processes
+    process_directory(input_dir, output_dir, apply_superpixel, label="Superpixel Transform", workers=workers, seed=seed,
+                      refresh_interval=refresh_interval, change_threshold=change_threshold, downscale=downscale)
 
 if __name__ == "__main__":
     input_dir = "C:\\Users\\Wilbert\\Desktop\\data\\cleaned\\assault"
@@ -0,0 +1,207 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+STAGES = ("decoded", "transformed", "encoded")
+
+# How often worker processes send their counters to the parent
+PUSH_INTERVAL = 1.0
+
+class Telemetry:
+    """
+    Frame counters and stage timings for the augmentation scripts.
+
+    The hot loop only adds to a few numbers under a lock; formatting and writing reports happens
+    on a background reporter thread at a configurable interval.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._frames = dict.fromkeys(STAGES, 0)
+        self._seconds = dict.fromkeys(STAGES, 0.0)
+        self._files = {}
+        self._last_report = (self._start, dict(self._frames))
+        self._reporter = None
+        self._stop_event = threading.Event()
+
+    def add(self, stage, frames=1, seconds=0.0):
+        with self._lock:
+            self._frames[stage] += frames
+            self._seconds[stage] += seconds
+
+    def timed(self, stage, function, *args, **kwargs):
+        """Call function(*args, **kwargs), counting one frame and its run time against `stage`."""
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.add(stage, 1, time.perf_counter() - start)
+        return result
+
+    def read_frame(self, cap):
+        """Read a frame from a capture, counting it as decoded only if the read succeeded."""
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        if ret:
+            self.add("decoded", 1, time.perf_counter() - start)
+        return ret, frame
+
+    @contextmanager
+    def track_file(self, path):
+        """Record the wall time spent on one file."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._files[path] = time.perf_counter() - start
+
+    def snapshot(self):
+        """
+        Return the current counters as a dict: frames and busy seconds per stage, per-stage fps
+        (frames per busy second), overall and recent throughput, and per-file wall times.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            frames = dict(self._frames)
+            seconds = dict(self._seconds)
+            files = dict(self._files)
+            last_time, last_frames = self._last_report
+            self._last_report = (now, dict(frames))
+
+        elapsed = now - self._start
+        interval = max(now - last_time, 1e-9)
+        return {
+            "elapsed_seconds": elapsed,
+            "frames": frames,
+            "busy_seconds": seconds,
+            "stage_fps": {stage: frames[stage] / seconds[stage] if seconds[stage] else 0.0 for stage in STAGES},
+            "throughput_fps": {stage: frames[stage] / elapsed if elapsed else 0.0 for stage in STAGES},
+            "recent_fps": {stage: (frames[stage] - last_frames[stage]) / interval for stage in STAGES},
+            "files_completed": len(files),
+            "file_seconds": files,
+        }
+
+    def export_totals(self):
+        """Return the raw counters and reset them, so a worker process can hand them to the parent."""
+        with self._lock:
+            totals = {"frames": self._frames, "seconds": self._seconds, "files": self._files}
+            self._frames = dict.fromkeys(STAGES, 0)
+            self._seconds = dict.fromkeys(STAGES, 0.0)
+            self._files = {}
+        return totals
+
+    def merge(self, totals):
+        """Add counters exported by export_totals (e.g. from a worker process)."""
+        with self._lock:
+            for stage in STAGES:
+                self._frames[stage] += totals["frames"][stage]
+                self._seconds[stage] += totals["seconds"][stage]
+            self._files.update(totals["files"])
+
+    def start_pushing(self, updates, interval=PUSH_INTERVAL):
+        """
+        In a worker process: clear the counters inherited from the parent and send what accumulates to
+        `updates` (a multiprocessing.Queue) every `interval` seconds, so the parent's reporter stays live
+        while files are still in progress. Meant as a process pool initializer.
+        """
+        self.export_totals()
+
+        def run():
+            while True:
+                time.sleep(interval)
+                totals = self.export_totals()
+                if any(totals["frames"].values()) or totals["files"]:
+                    updates.put(totals)
+
+        threading.Thread(target=run, name="telemetry-push", daemon=True).start()
+
+    def start_merging(self, updates):
+        """
+        In the parent: merge counters from worker processes as they arrive on `updates`,
+        until a None is put on it. Returns the merging thread.
+        """
+        def run():
+            for totals in iter(updates.get, None):
+                self.merge(totals)
+
+        thread = threading.Thread(target=run, name="telemetry-merge", daemon=True)
+        thread.start()
+        return thread
+
+    def report(self, stream=sys.stderr, json_path=None, prometheus_path=None):
+        """Write one report line to `stream` and optionally a JSON and/or Prometheus text file."""
+        stats = self.snapshot()
+        if stream is not None:
+            stage_text = ", ".join(
+                f"{stage} {stats['frames'][stage]} ({stats['recent_fps'][stage]:.1f} fps now, "
+                f"{stats['stage_fps'][stage]:.1f} fps busy)" for stage in STAGES)
+            print(f"[telemetry] {stats['elapsed_seconds']:.1f}s: {stage_text}, "
+                  f"{stats['files_completed']} files done", file=stream, flush=True)
+        if json_path:
+            _write_atomic(json_path, json.dumps(stats, indent=2))
+        if prometheus_path:
+            _write_atomic(prometheus_path, format_prometheus(stats))
+        return stats
+
+    def start_reporter(self, interval=None, stream=sys.stderr, json_path=None, prometheus_path=None):
+        """
+        Start reporting every `interval` seconds on a background thread.
+
+        Unset arguments fall back to the VIDEO_AUG_TELEMETRY_INTERVAL (default 10),
+        VIDEO_AUG_TELEMETRY_JSON and VIDEO_AUG_TELEMETRY_PROM environment variables.
+
+        Returns:
+            bool: True if a reporter was started, False if one was already running.
+        """
+        if self._reporter is not None:
+            return False
+        if interval is None:
+            interval = float(os.environ.get("VIDEO_AUG_TELEMETRY_INTERVAL", 10))
+        json_path = json_path or os.environ.get("VIDEO_AUG_TELEMETRY_JSON")
+        prometheus_path = prometheus_path or os.environ.get("VIDEO_AUG_TELEMETRY_PROM")
+        self._report_args = (stream, json_path, prometheus_path)
+
+        def run():
+            while not self._stop_event.wait(interval):
+                self.report(*self._report_args)
+
+        self._stop_event.clear()
+        self._reporter = threading.Thread(target=run, name="telemetry", daemon=True)
+        self._reporter.start()
+        return True
+
+    def stop_reporter(self):
+        """Stop the reporter thread and write a final report."""
+        if self._reporter is None:
+            return
+        self._stop_event.set()
+        self._reporter.join()
+        self._reporter = None
+        self.report(*self._report_args)
+
+def format_prometheus(stats):
+    """Format a snapshot in the Prometheus text exposition format."""
+    lines = [
+        "# TYPE video_aug_frames_total counter",
+        *(f'video_aug_frames_total{{stage="{stage}"}} {stats["frames"][stage]}' for stage in STAGES),
+        "# TYPE video_aug_busy_seconds_total counter",
+        *(f'video_aug_busy_seconds_total{{stage="{stage}"}} {stats["busy_seconds"][stage]:.6f}' for stage in STAGES),
+        "# TYPE video_aug_stage_fps gauge",
+        *(f'video_aug_stage_fps{{stage="{stage}"}} {stats["stage_fps"][stage]:.3f}' for stage in STAGES),
+        "# TYPE video_aug_files_completed_total counter",
+        f"video_aug_files_completed_total {stats['files_completed']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path, text):
+    # Write next to the target and rename, so collectors never read a half-written file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+# Shared instance used by all scripts in this process
+telemetry = Telemetry()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# The scripts live at the repository root and import each other by module name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _write_video(path, num_frames=5, size=(32, 24), fourcc="mp4v"):
+    rng = np.random.default_rng(len(str(path)))
+    out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), 10, size)
+    for _ in range(num_frames):
+        out.write(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+    out.release()
+
+@pytest.fixture
+def write_video():
+    """Write a small random-noise test video: write_video(path, num_frames=5, size=(32, 24))."""
+    return _write_video
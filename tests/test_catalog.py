@@ -0,0 +1,22 @@
+import os
+
+from catalog import Catalog
+
+def test_scan_keeps_rows_of_other_extensions(tmp_path, write_video):
+    video_dir = tmp_path / "assault"
+    video_dir.mkdir()
+    write_video(video_dir / "a.mp4")
+    write_video(video_dir / "b.avi", fourcc="MJPG")
+
+    catalog = Catalog(str(tmp_path / "catalog.db"))
+    catalog.scan(str(video_dir), class_name="assault")
+    assert sorted(os.path.basename(row["path"]) for row in catalog.videos()) == ["a.mp4", "b.avi"]
+
+    # A narrower scan only manages its own file types
+    catalog.scan(str(video_dir), extensions=(".mp4",))
+    assert sorted(os.path.basename(row["path"]) for row in catalog.videos()) == ["a.mp4", "b.avi"]
+
+    os.remove(video_dir / "a.mp4")
+    catalog.scan(str(video_dir), extensions=(".mp4",))
+    assert [os.path.basename(row["path"]) for row in catalog.videos()] == ["b.avi"]
+    catalog.close()
@@ -0,0 +1,32 @@
+import random
+
+import numpy as np
+
+from dataset import AugmentedClipDataset, load_augmented_clip
+from down import RandomDownsample
+
+def test_clip_leaves_global_random_state_alone(tmp_path, write_video):
+    video_path = str(tmp_path / "a.mp4")
+    write_video(video_path, num_frames=12)
+
+    random.seed(1)
+    np.random.seed(1)
+    expected = (random.random(), np.random.random())
+    random.seed(1)
+    np.random.seed(1)
+    load_augmented_clip(video_path, [RandomDownsample()], clip_len=4, seed=7)
+    assert (random.random(), np.random.random()) == expected
+
+def test_transforms_are_fresh_per_clip(tmp_path, write_video):
+    video_paths = [str(tmp_path / f"{name}.mp4") for name in "abcdef"]
+    for video_path in video_paths:
+        write_video(video_path, num_frames=8, size=(64, 48))
+
+    downsample = RandomDownsample()
+    dataset = AugmentedClipDataset(video_paths, [downsample], clip_len=4, num_workers=0, seed=0)
+    shapes = {clip.shape for clip, _ in dataset}
+    # Each clip draws its own scale, and the dataset's instance is never used up
+    assert len(shapes) > 1
+    assert downsample.scale is None
+    # The same epoch gives the same clips
+    assert shapes == {clip.shape for clip, _ in dataset}
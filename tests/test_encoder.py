@@ -0,0 +1,48 @@
+import os
+import stat
+import sys
+
+import numpy as np
+import pytest
+
+import encoder
+from invertcolor import apply_color_inversion
+from parallel import process_directory
+
+# Stands in for ffmpeg: reads the frames, writes a truncated file and fails
+FAILING_FFMPEG = """#!{python}
+import sys
+sys.stdin.buffer.read()
+with open(sys.argv[-1], "wb") as f:
+    f.write(b"\\0" * 1000)
+sys.stderr.write("simulated encoder failure\\n")
+sys.exit(1)
+"""
+
+@pytest.fixture
+def failing_ffmpeg(tmp_path, monkeypatch):
+    path = tmp_path / "ffmpeg"
+    path.write_text(FAILING_FFMPEG.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setitem(encoder._settings, "backend", "ffmpeg")
+    monkeypatch.setitem(encoder._settings, "ffmpeg", str(path))
+    return str(path)
+
+@pytest.mark.skipif(os.name == "nt", reason="the fake ffmpeg is a script with a shebang line")
+def test_release_raises_when_ffmpeg_fails(tmp_path, failing_ffmpeg):
+    writer = encoder.open_video_writer(str(tmp_path / "out.mp4"), 10, (32, 24))
+    writer.write(np.zeros((24, 32, 3), dtype=np.uint8))
+    with pytest.raises(IOError, match="simulated encoder failure"):
+        writer.release()
+
+@pytest.mark.skipif(os.name == "nt", reason="the fake ffmpeg is a script with a shebang line")
+def test_failed_encode_is_not_committed(tmp_path, failing_ffmpeg, write_video):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    write_video(input_dir / "a.mp4")
+    output_dir = tmp_path / "out"
+
+    failed = process_directory(str(input_dir), str(output_dir), apply_color_inversion)
+
+    assert failed == ["a.mp4"]
+    assert not [name for name in os.listdir(output_dir) if name.endswith(".mp4")]
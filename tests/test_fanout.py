@@ -0,0 +1,47 @@
+import os
+
+import cv2
+
+import fanout
+from down import RandomDownsample
+
+def growing(frame):
+    # A transform whose output size changes within a clip
+    growing.calls += 1
+    return cv2.resize(frame, (frame.shape[1] + growing.calls, frame.shape[0]))
+
+def invert(frame):
+    return 255 - frame
+
+def frame_sizes(path):
+    cap = cv2.VideoCapture(str(path))
+    sizes = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        sizes.append(frame.shape)
+    cap.release()
+    return sizes
+
+def test_random_downsample_keeps_one_size_per_clip(tmp_path, write_video):
+    input_dir = tmp_path / "shooting"
+    input_dir.mkdir()
+    write_video(input_dir / "a.mp4", num_frames=20, size=(64, 48))
+    output_dir = tmp_path / "shootingdownsample"
+
+    failed = fanout.process_videos_in_directory(str(input_dir), {str(output_dir): RandomDownsample()}, seed=3)
+    assert failed == []
+    sizes = frame_sizes(output_dir / "a.mp4")
+    assert len(sizes) == 20 and len(set(sizes)) == 1
+
+def test_size_change_fails_the_output(tmp_path, write_video):
+    input_dir = tmp_path / "shooting"
+    input_dir.mkdir()
+    write_video(input_dir / "a.mp4", num_frames=10)
+    growing.calls = 0
+
+    failed = fanout.process_videos_in_directory(
+        str(input_dir), {str(tmp_path / "grow"): growing, str(tmp_path / "in"): invert})
+    assert failed == ["a.mp4"]
+    assert not [name for name in os.listdir(tmp_path / "grow") if name.endswith(".mp4")]
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter, so forcing the spawn start method does not leak into other tests
+SPAWN_RUN = """
+import multiprocessing
+import sys
+from invertcolor import apply_color_inversion
+from parallel import process_directory
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method("spawn")
+    failed = process_directory(sys.argv[1], sys.argv[2], apply_color_inversion, workers=2, seed=0)
+    sys.exit(1 if failed else 0)
+"""
+
+def test_workers_under_spawn(tmp_path, write_video):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    for name in ("a.mp4", "b.mp4"):
+        write_video(input_dir / name)
+    output_dir = tmp_path / "out"
+    script = tmp_path / "spawn_run.py"
+    script.write_text(SPAWN_RUN)
+
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+               VIDEO_AUG_ENCODER="opencv")
+    result = subprocess.run([sys.executable, str(script), str(input_dir), str(output_dir)], env=env,
+                            capture_output=True, text=True, timeout=300)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert sorted(name for name in os.listdir(output_dir) if name.endswith(".mp4")) == ["a.mp4", "b.mp4"]
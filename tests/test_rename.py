@@ -0,0 +1,20 @@
+import os
+
+import invertcolor
+from cache import MANIFEST_NAME
+from rename import rename_files_in_directory
+
+def test_rename_keeps_resume(tmp_path, write_video, capsys):
+    input_dir, output_dir = tmp_path / "theft", tmp_path / "theftinv"
+    input_dir.mkdir()
+    write_video(input_dir / "a.mp4")
+
+    invertcolor.process_videos_in_directory(str(input_dir), str(output_dir))
+    rename_files_in_directory(str(output_dir), prefix="theft", suffix="inv")
+    assert sorted(os.listdir(output_dir)) == [MANIFEST_NAME, "theftainv.mp4"]
+
+    # The renamed output is still recognised as finished
+    capsys.readouterr()
+    invertcolor.process_videos_in_directory(str(input_dir), str(output_dir))
+    assert "Skipping a.mp4" in capsys.readouterr().out
+    assert sorted(os.listdir(output_dir)) == [MANIFEST_NAME, "theftainv.mp4"]
@@ -0,0 +1,137 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import shards
+from shards import INDEX_NAME, ShardReader, ShardWriter, pack_videos_in_directory
+
+def invert(frame):
+    return 255 - frame
+
+def shard_files(shard_dir):
+    return sorted(name for name in os.listdir(shard_dir) if name.endswith(".tar"))
+
+def test_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    clips = {f"clip{i}": rng.integers(0, 256, (4, 8, 6, 3), dtype=np.uint8) for i in range(5)}
+
+    # A tiny shard size makes every clip roll over into its own shard
+    writer = ShardWriter(str(tmp_path), max_shard_bytes=1)
+    for key, clip in clips.items():
+        writer.add_clip(key, clip, fps=12.5, metadata={"key": key})
+    writer.close()
+
+    reader = ShardReader(str(tmp_path))
+    assert sorted(reader.keys()) == sorted(clips)
+    assert len(reader.shards()) == len(clips)
+    for key, clip in clips.items():
+        np.testing.assert_array_equal(reader.read_clip(key), clip)
+        assert reader.index[key]["metadata"] == {"key": key}
+
+    streamed = {key: clip for key, clip in reader}
+    assert sorted(streamed) == sorted(clips)
+    for key, clip in streamed.items():
+        np.testing.assert_array_equal(clip, clips[key])
+
+def test_frame_ranges_read_only_their_chunks(tmp_path):
+    clip = np.random.default_rng(1).integers(0, 256, (21, 6, 4, 3), dtype=np.uint8)
+    writer = ShardWriter(str(tmp_path), chunk_frames=8)
+    writer.add_clip("a", clip)
+    writer.close()
+
+    reader = ShardReader(str(tmp_path))
+    assert len(reader.index["a"]["chunks"]) == 3
+    np.testing.assert_array_equal(reader.read_clip("a"), clip)
+    for start, stop in [(0, 1), (5, 13), (8, 16), (16, 21), (20, 30), (3, 3)]:
+        np.testing.assert_array_equal(reader.read_clip("a", start, stop), clip[start:stop])
+    np.testing.assert_array_equal(np.stack(list(reader.iter_frames("a", 9, 18))), clip[9:18])
+    _, streamed = next(iter(reader))
+    np.testing.assert_array_equal(streamed, clip)
+
+    # Reading frames 16-20 only touches the last chunk's bytes
+    entry = reader.index["a"]
+    with open(os.path.join(str(tmp_path), entry["shard"]), "r+b") as f:
+        f.seek(entry["offset"])
+        f.write(b"\0" * entry["chunks"][2])
+    np.testing.assert_array_equal(reader.read_clip("a", 16, 21), clip[16:21])
+
+def test_duplicate_key_is_rejected(tmp_path):
+    writer = ShardWriter(str(tmp_path))
+    writer.add_clip("a", np.zeros((1, 2, 2, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        writer.add_clip("a", np.zeros((1, 2, 2, 3), dtype=np.uint8))
+    writer.close()
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_same_stem_different_extension(tmp_path, workers, write_video):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    write_video(str(input_dir / "a.mp4"))
+    write_video(str(input_dir / "a.mov"))
+
+    shard_dir = str(tmp_path / "shards")
+    pack_videos_in_directory(str(input_dir), shard_dir, {"in": invert}, class_name="x", workers=workers)
+
+    assert sorted(ShardReader(shard_dir).keys()) == ["xin/a.mov", "xin/a.mp4"]
+
+def test_rerun_replaces_old_shards_and_keeps_other_classes(tmp_path, write_video):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    write_video(str(input_dir / "a.mp4"))
+    shard_dir = str(tmp_path / "shards")
+
+    pack_videos_in_directory(str(input_dir), shard_dir, {"in": invert}, class_name="x")
+    pack_videos_in_directory(str(input_dir), shard_dir, {"in": invert}, class_name="y")
+    first_x = [name for name in shard_files(shard_dir) if name.startswith("x-")]
+
+    pack_videos_in_directory(str(input_dir), shard_dir, {"in": invert}, class_name="x")
+    second_x = [name for name in shard_files(shard_dir) if name.startswith("x-")]
+
+    assert len(second_x) == 1 and second_x != first_x
+    reader = ShardReader(shard_dir)
+    assert sorted(reader.keys()) == ["xin/a.mp4", "yin/a.mp4"]
+    np.testing.assert_array_equal(reader.read_clip("xin/a.mp4"), reader.read_clip("yin/a.mp4"))
+
+def test_crashed_run_leaves_previous_shards_readable(tmp_path, monkeypatch, write_video):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    write_video(str(input_dir / "a.mp4"), num_frames=6)
+    write_video(str(input_dir / "b.mp4"), num_frames=3)
+    shard_dir = str(tmp_path / "shards")
+
+    pack_videos_in_directory(str(input_dir), shard_dir, {"in": invert}, class_name="x")
+    reader = ShardReader(shard_dir)
+    before = {key: reader.read_clip(key) for key in reader.keys()}
+    with open(os.path.join(shard_dir, INDEX_NAME)) as f:
+        index_before = json.load(f)
+
+    # Crash partway through the second run, after some clips went into a new shard
+    original_pack_video = shards.pack_video
+    packed = []
+
+    def crashing_pack_video(*args, **kwargs):
+        if packed:
+            raise RuntimeError("simulated crash")
+        packed.append(args[1])
+        original_pack_video(*args, **kwargs)
+
+    monkeypatch.setattr(shards, "pack_video", crashing_pack_video)
+    with pytest.raises(RuntimeError):
+        pack_videos_in_directory(str(input_dir), shard_dir, {"in": invert}, class_name="x")
+
+    # The index is untouched and still reads the old clips correctly
+    with open(os.path.join(shard_dir, INDEX_NAME)) as f:
+        assert json.load(f) == index_before
+    reader = ShardReader(shard_dir)
+    for key, clip in before.items():
+        np.testing.assert_array_equal(reader.read_clip(key), clip)
+
+    # A clean re-run swaps in new shards and removes both the old and the crashed run's shards
+    monkeypatch.setattr(shards, "pack_video", original_pack_video)
+    pack_videos_in_directory(str(input_dir), shard_dir, {"in": invert}, class_name="x")
+    reader = ShardReader(shard_dir)
+    assert shard_files(shard_dir) == reader.shards()
+    for key, clip in before.items():
+        np.testing.assert_array_equal(reader.read_clip(key), clip)